@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按账号缓冲的日志输出 - 并发登录时每个账号的输出在内存中缓冲，账号结束时一次性整块写出
+
+  NETLIB_LOG_LEVEL    日志级别: debug、info (默认)、warning、error；逐个选择器的诊断信息只在 debug 输出
+  NETLIB_LOG_BUFFER   按账号缓冲: auto (默认，并发数大于 1 时开启)、1、0
+  NETLIB_PROGRESS     进度行: auto (默认，终端上原地刷新，否则每个账号块后一行)、0
+
+缓冲期间 print 和 traceback 的输出都进入当前线程的缓冲区 (stderr 也并入同一块，保证顺序)，
+其他线程 (主线程、后台线程) 的输出照常直接写出。
+"""
+
+import io
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+_local = threading.local()
+_write_lock = threading.Lock()
+_level = None
+
+# 安装后的原始输出流、进度来源和终端上是否显示着进度行
+_streams = None
+_progress_source = None
+_progress_mode = None
+_progress_shown = False
+
+
+def log_level():
+    global _level
+    if _level is None:
+        name = os.environ.get('NETLIB_LOG_LEVEL', 'info').strip().lower()
+        if name not in LEVELS:
+            print(f"⚠️ NETLIB_LOG_LEVEL 无效: {name}，使用 info")
+            name = 'info'
+        _level = LEVELS[name]
+    return _level
+
+
+def log_enabled(level):
+    return LEVELS[level] >= log_level()
+
+
+def log(message, level='info'):
+    """按级别输出一行，低于 NETLIB_LOG_LEVEL 的丢弃"""
+    if log_enabled(level):
+        print(message)
+
+
+def debug(message):
+    log(message, 'debug')
+
+
+def buffering_enabled(workers):
+    value = os.environ.get('NETLIB_LOG_BUFFER', 'auto').strip().lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    return workers > 1
+
+
+class _AccountStream(io.TextIOBase):
+    """代替 sys.stdout / sys.stderr: 有账号缓冲区的线程写入缓冲区，其他线程直接写出"""
+
+    def __init__(self, target):
+        self.target = target
+
+    @property
+    def encoding(self):
+        return getattr(self.target, 'encoding', 'utf-8')
+
+    def isatty(self):
+        return self.target.isatty()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        buffer = getattr(_local, 'buffer', None)
+        if buffer is not None:
+            buffer.append(text)
+            return len(text)
+        with _write_lock:
+            _clear_progress()
+            self.target.write(text)
+        return len(text)
+
+    def flush(self):
+        if getattr(_local, 'buffer', None) is None:
+            self.target.flush()
+
+
+def _clear_progress():
+    """在写出其他内容前擦掉终端上的进度行 (调用方持有 _write_lock)"""
+    global _progress_shown
+    if _progress_shown:
+        _streams[0].write('\r\033[K')
+        _progress_shown = False
+
+
+def _progress_text():
+    read, done = _progress_source()
+    return f"⏳ 进度: 已完成 {done} / 已读取 {read} 个账号"
+
+
+def install_account_log(progress_source=None):
+    """替换 sys.stdout 和 sys.stderr，之后 account_output 中的输出按账号缓冲"""
+    global _streams, _progress_source, _progress_mode
+    if _streams is not None:
+        return
+    _streams = (sys.stdout, sys.stderr)
+    _progress_source = progress_source
+    mode = os.environ.get('NETLIB_PROGRESS', 'auto').strip().lower()
+    if progress_source is None or mode in ('0', 'false', 'no', 'off'):
+        _progress_mode = None
+    else:
+        _progress_mode = 'live' if sys.stdout.isatty() else 'line'
+    sys.stdout = _AccountStream(_streams[0])
+    sys.stderr = _AccountStream(_streams[1])
+
+
+def uninstall_account_log():
+    """恢复原始输出流"""
+    global _streams
+    if _streams is None:
+        return
+    with _write_lock:
+        _clear_progress()
+        sys.stdout, sys.stderr = _streams
+        _streams = None
+    sys.stdout.flush()
+
+
+@contextmanager
+def account_output():
+    """缓冲当前线程在这个账号期间的所有输出，结束时整块写出并刷新进度行；未安装时不做任何事"""
+    if _streams is None or getattr(_local, 'buffer', None) is not None:
+        yield
+        return
+    _local.buffer = []
+    try:
+        yield
+    finally:
+        block = ''.join(_local.buffer)
+        _local.buffer = None
+        _flush_block(block)
+
+
+def _flush_block(block):
+    global _progress_shown
+    out = _streams[0] if _streams is not None else sys.stdout
+    with _write_lock:
+        _clear_progress()
+        if _progress_mode == 'line':
+            block += _progress_text() + '\n'
+        out.write(block)
+        if _progress_mode == 'live':
+            out.write(_progress_text())
+            _progress_shown = True
+        out.flush()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+账号来源 - 按需逐个读取账号，支持环境变量、数字后缀变量、JSON/JSONL 文件和标准输入
+
+所有来源都是生成器，账号在被调度时才解析，数万个账号也不需要一次性读入内存。
+"""
+
+import json
+import os
+import sys
+from collections import namedtuple
+
+# meta 为账号的附加信息 (JSON 来源中除用户名和密码之外的字段)
+Account = namedtuple('Account', 'username password meta')
+
+_decoder = json.JSONDecoder()
+
+
+def parse_account_item(item):
+    """把一条原始记录解析为 Account，格式错误时返回错误说明字符串"""
+    if isinstance(item, str):
+        item = item.strip()
+        if ':' not in item:
+            return f"{item} (缺少冒号分隔符)"
+        username, password = item.split(':', 1)
+        meta = {}
+    elif isinstance(item, dict):
+        meta = dict(item)
+        username = str(meta.pop('username', '') or meta.pop('user', '') or '')
+        password = str(meta.pop('password', '') or meta.pop('pass', '') or '')
+    else:
+        return f"不支持的记录类型: {type(item).__name__}"
+
+    username, password = username.strip(), password.strip()
+    if not username or not password:
+        return "用户名或密码为空"
+    return Account(username, password, meta)
+
+
+def iter_account_string(value, separator=','):
+    """逐个切分 user1:pass1,user2:pass2 形式的字符串，不构建完整列表"""
+    start = 0
+    while start <= len(value):
+        end = value.find(separator, start)
+        if end < 0:
+            end = len(value)
+        item = value[start:end]
+        if item.strip():
+            yield item
+        start = end + 1
+
+
+def iter_numbered_env(environ=None):
+    """读取 NETLIB_USERNAME1/NETLIB_PASSWORD1、... 以及不带数字的单账号变量"""
+    environ = os.environ if environ is None else environ
+    if environ.get('NETLIB_USERNAME') or environ.get('NETLIB_PASSWORD'):
+        yield {'username': environ.get('NETLIB_USERNAME', ''),
+               'password': environ.get('NETLIB_PASSWORD', '')}
+    index = 1
+    while f"NETLIB_USERNAME{index}" in environ or f"NETLIB_PASSWORD{index}" in environ:
+        yield {'username': environ.get(f"NETLIB_USERNAME{index}", ''),
+               'password': environ.get(f"NETLIB_PASSWORD{index}", '')}
+        index += 1
+
+
+def iter_json_array(chunks):
+    """从文本块流中逐个解析 JSON 数组的元素，也接受 {用户名: 密码} 形式的对象"""
+    buffer = ''
+    chunks = iter(chunks)
+    exhausted = False
+    started = False
+
+    def fill():
+        nonlocal buffer, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+        else:
+            buffer += chunk
+
+    while True:
+        stripped = buffer.lstrip()
+        if not started:
+            if not stripped:
+                if exhausted:
+                    return
+                fill()
+                continue
+            if stripped[0] == '{':
+                # 整个文件是一个对象: 读完后按 用户名 -> 密码 展开
+                while not exhausted:
+                    fill()
+                data = json.loads(buffer)
+                for username, password in data.items():
+                    yield {'username': username, 'password': password}
+                return
+            if stripped[0] != '[':
+                raise ValueError('JSON 账号数据必须是数组或对象')
+            buffer = stripped[1:]
+            started = True
+            continue
+
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = _decoder.raw_decode(buffer)
+        except ValueError:
+            if exhausted:
+                raise
+            fill()
+            continue
+        if end >= len(buffer) and not exhausted:
+            # 元素恰好在块边界结束时先确认后面的内容
+            fill()
+            continue
+        buffer = buffer[end:]
+        yield item
+
+
+def iter_text_chunks(stream, size=65536):
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_lines(stream):
+    """JSONL 或 user:pass 每行一条，空行和 # 注释行忽略"""
+    for line in stream:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        yield json.loads(line) if line.startswith(('{', '"')) else line
+
+
+def iter_file(path):
+    """按扩展名读取账号文件: .json 为数组，其他为每行一条；- 表示标准输入"""
+    if path == '-':
+        yield from iter_lines(sys.stdin)
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            yield from iter_json_array(iter_text_chunks(f))
+        else:
+            yield from iter_lines(f)
+
+
+def open_account_source(environ=None):
+    """根据环境变量选择账号来源，返回 (来源说明, 原始记录迭代器)，没有配置时返回 None
+
+    优先级: NETLIB_ACCOUNTS_FILE (路径或 - 表示标准输入) > NETLIB_ACCOUNTS >
+    NETLIB_ACCOUNTS_JSON > NETLIB_USERNAME1/NETLIB_PASSWORD1 等数字后缀变量。
+    """
+    environ = os.environ if environ is None else environ
+    path = environ.get('NETLIB_ACCOUNTS_FILE', '').strip()
+    if path:
+        return f"NETLIB_ACCOUNTS_FILE ({'标准输入' if path == '-' else path})", iter_file(path)
+    value = environ.get('NETLIB_ACCOUNTS')
+    if value:
+        return f"NETLIB_ACCOUNTS (长度: {len(value)})", iter_account_string(value)
+    value = environ.get('NETLIB_ACCOUNTS_JSON')
+    if value:
+        return f"NETLIB_ACCOUNTS_JSON (长度: {len(value)})", iter_json_array([value])
+    if environ.get('NETLIB_USERNAME') or environ.get('NETLIB_USERNAME1'):
+        return "NETLIB_USERNAME/NETLIB_PASSWORD 数字后缀变量", iter_numbered_env(environ)
+    return None
+
+
+def iter_valid_accounts(items):
+    """逐个解析原始记录，打印格式错误并跳过，只产出有效账号"""
+    for i, item in enumerate(items, 1):
+        account = parse_account_item(item)
+        if isinstance(account, str):
+            print(f"❌ 账号 {i} 格式错误: {account}")
+            continue
+        print(f"   账号 {i}: {account.username}")
+        yield account
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录流程基准测试 - 在本地替身服务器上用合成账号运行完整的 main() 流程
+
+用法:
+  python benchmark.py --accounts 20 --workers 4 --backend http --latency 0.05
+  python benchmark.py --accounts 20 --baseline bench_results_old.json
+  python benchmark.py --backend selenium --env NETLIB_FILL_MODE=keys   # 对比逐键输入的往返次数
+  python benchmark.py --backend selenium --env NETLIB_LEAN=1 --baseline bench_results_full.json
+  python benchmark.py --backend selenium --env NETLIB_PROFILE_TEMPLATE=1 --baseline bench_results_full.json
+  python benchmark.py --backend cdp --baseline bench_results_selenium.json   # 直连 CDP 与 chromedriver 对比
+
+输出每个阶段的 p50/p95/p99 耗时、端到端吞吐量和每账号的 WebDriver 往返次数，结果保存为 JSON，方便对比不同版本。
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import time
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def synthetic_accounts(count, wrong_every=0):
+    """生成合成账号；wrong_every > 0 时每隔若干个账号使用错误密码"""
+    accounts = {}
+    credentials = []
+    for i in range(1, count + 1):
+        username, password = f"bench{i:05d}", f"pass{i:05d}"
+        accounts[username] = password
+        if wrong_every and i % wrong_every == 0:
+            password = 'wrong-password'
+        credentials.append(f"{username}:{password}")
+    return accounts, ','.join(credentials)
+
+
+def run_main(quiet):
+    """运行登录脚本的 main()，返回退出码"""
+    import fixed_browser_login
+
+    with contextlib.ExitStack() as stack:
+        if quiet:
+            output = io.StringIO()
+            stack.enter_context(contextlib.redirect_stdout(output))
+            stack.enter_context(contextlib.redirect_stderr(output))
+        try:
+            fixed_browser_login.main([])
+        except SystemExit as e:
+            return e.code
+    return 0
+
+
+def format_seconds(value):
+    return '-' if value is None else f"{value * 1000:.1f}ms"
+
+
+def print_report(report):
+    print(f"\n{'=' * 60}")
+    print("基准测试结果")
+    print(f"{'=' * 60}")
+    config = report['config']
+    print(f"版本: {report['revision'] or '未知'}  后端: {config['backend']}  "
+          f"账号数: {config['accounts']}  并发: {config['workers']}")
+    print(f"总耗时: {report['elapsed']:.2f} 秒  吞吐量: {report['throughput']:.2f} 账号/秒  "
+          f"退出码: {report['exit_code']}")
+    print(f"服务器请求数: {report['server']['requests']}  注入故障: {report['server']['injected_failures']}")
+    if report.get('webdriver_commands'):
+        print(f"WebDriver 往返: {report['webdriver_commands']} 次  "
+              f"每账号 {report['round_trips_per_account']:.1f} 次")
+    print(f"\n{'阶段':<16}{'次数':>6}{'失败':>6}{'p50':>12}{'p95':>12}{'p99':>12}")
+    for name, stats in sorted(report['phases'].items()):
+        print(f"{name:<16}{stats['count']:>6}{stats['failed']:>6}"
+              f"{format_seconds(stats['p50']):>12}{format_seconds(stats['p95']):>12}"
+              f"{format_seconds(stats['p99']):>12}")
+    if report.get('pages'):
+        print(f"\n{'页面':<16}{'次数':>6}{'平均字节':>12}{'资源数':>8}{'p50':>12}{'p95':>12}")
+        for name, stats in sorted(report['pages'].items()):
+            print(f"{name:<16}{stats['count']:>6}{stats['bytes'] / 1024:>10.1f}KB{stats['resources']:>8.1f}"
+                  f"{format_seconds(stats['p50']):>12}{format_seconds(stats['p95']):>12}")
+
+
+def compare_with_baseline(report, baseline_path):
+    """与之前保存的结果对比 p95 和吞吐量"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\n与基线对比 ({baseline_path}, 版本 {baseline.get('revision') or '未知'}):")
+    for name, stats in sorted(report['phases'].items()):
+        old = baseline.get('phases', {}).get(name)
+        if not old or not old.get('p95'):
+            continue
+        change = (stats['p95'] - old['p95']) / old['p95'] * 100
+        marker = '⚠️ ' if change > 10 else '   '
+        print(f"{marker}{name:<16} p95 {format_seconds(old['p95'])} -> {format_seconds(stats['p95'])} ({change:+.1f}%)")
+    if baseline.get('throughput'):
+        change = (report['throughput'] - baseline['throughput']) / baseline['throughput'] * 100
+        print(f"   吞吐量 {baseline['throughput']:.2f} -> {report['throughput']:.2f} 账号/秒 ({change:+.1f}%)")
+    for name, stats in sorted(report.get('pages', {}).items()):
+        old = baseline.get('pages', {}).get(name)
+        if old:
+            print(f"   页面 {name:<11} {old['bytes'] / 1024:.1f}KB -> {stats['bytes'] / 1024:.1f}KB, "
+                  f"p50 {format_seconds(old['p50'])} -> {format_seconds(stats['p50'])}")
+    if baseline.get('round_trips_per_account') and report.get('round_trips_per_account'):
+        print(f"   每账号 WebDriver 往返 {baseline['round_trips_per_account']:.1f} -> "
+              f"{report['round_trips_per_account']:.1f} 次")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='登录流程基准测试')
+    parser.add_argument('--accounts', type=int, default=10, help='合成账号数量')
+    parser.add_argument('--workers', type=int, default=1, help='并发登录数 (NETLIB_WORKERS)')
+    parser.add_argument('--backend', default='http', choices=['http', 'selenium', 'cdp'], help='登录后端')
+    parser.add_argument('--latency', type=float, default=0.0, help='替身服务器每个请求的延迟秒数')
+    parser.add_argument('--jitter', type=float, default=0.0, help='替身服务器额外随机延迟上限秒数')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='替身服务器随机返回 503 的概率')
+    parser.add_argument('--wrong-every', type=int, default=0, help='每隔 N 个账号使用错误密码')
+    parser.add_argument('--seed', type=int, default=1, help='故障注入随机种子')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='额外传给登录脚本的环境变量，可重复')
+    parser.add_argument('--output', default='bench_results.json', help='结果 JSON 文件')
+    parser.add_argument('--baseline', help='用于对比的历史结果 JSON 文件')
+    parser.add_argument('--verbose', action='store_true', help='显示登录脚本的输出')
+    args = parser.parse_args()
+
+    from netlib_stub_server import StubServer
+
+    accounts, accounts_str = synthetic_accounts(args.accounts, args.wrong_every)
+    server = StubServer(accounts, latency=args.latency, jitter=args.jitter,
+                        failure_rate=args.failure_rate, seed=args.seed).start()
+
+    # 登录脚本在导入时读取站点地址，必须先设置环境变量
+    os.environ.update({
+        'NETLIB_ACCOUNTS': accounts_str,
+        'NETLIB_BASE_URL': server.base_url,
+        'NETLIB_BACKEND': args.backend,
+        'NETLIB_WORKERS': str(args.workers),
+        'NETLIB_MIN_INTERVAL': '0',
+        'NETLIB_JITTER': '0',
+        'NETLIB_SELECTOR_CACHE': '',
+        'NETLIB_STATE_FILE': '',
+    })
+    for item in args.env:
+        key, _, value = item.partition('=')
+        os.environ[key] = value
+
+    from login_metrics import enable_metrics, get_records, summarize, summarize_pages
+
+    enable_metrics()
+    print(f"🚀 开始基准测试: {args.accounts} 个账号, 后端 {args.backend}, 并发 {args.workers}")
+    start = time.perf_counter()
+    try:
+        exit_code = run_main(quiet=not args.verbose)
+    finally:
+        elapsed = time.perf_counter() - start
+        server.stop()
+
+    records = get_records()
+    import fixed_browser_login
+    webdriver_commands = fixed_browser_login._run_stats['webdriver_commands']
+    report = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'accounts': args.accounts,
+            'workers': args.workers,
+            'backend': args.backend,
+            'latency': args.latency,
+            'jitter': args.jitter,
+            'failure_rate': args.failure_rate,
+            'wrong_every': args.wrong_every,
+            'env': args.env,
+        },
+        'exit_code': exit_code,
+        'elapsed': elapsed,
+        'throughput': args.accounts / elapsed if elapsed else 0.0,
+        'server': {
+            'requests': server.requests,
+            'login_attempts': server.login_attempts,
+            'injected_failures': server.injected_failures,
+        },
+        'webdriver_commands': webdriver_commands,
+        'round_trips_per_account': webdriver_commands / args.accounts if args.accounts else 0.0,
+        'phases': summarize(records),
+        'pages': summarize_pages(records),
+    }
+
+    print_report(report)
+    if args.baseline:
+        compare_with_baseline(report, args.baseline)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻浏览器池 - 守护进程模式下跨轮次复用已启动的浏览器
+
+取出时做健康检查，归还时重置状态；使用次数达到上限或内存增长超过阈值时回收并重建。
+"""
+
+import threading
+import time
+from collections import deque
+
+from memory_control import MB, process_tree_rss
+
+
+def driver_pid(driver):
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    return getattr(process, 'pid', None)
+
+
+def is_healthy(driver):
+    """一次脚本调用确认浏览器和驱动仍然可用"""
+    try:
+        return driver.execute_script("return document.readyState") is not None
+    except Exception:
+        return False
+
+
+class BrowserPool:
+    """固定大小的浏览器池
+
+    create: 创建新浏览器的函数，失败时返回 None
+    reset: 清空浏览器状态的函数，在归还时调用
+    max_uses: 单个浏览器最多使用次数
+    max_growth: 相对启动后首次归还时的 RSS 允许增长的字节数
+    """
+
+    def __init__(self, size, create, reset, max_uses=50, max_growth=200 * MB):
+        self.size = max(1, size)
+        self.create = create
+        self.reset = reset
+        self.max_uses = max(1, max_uses)
+        self.max_growth = max_growth
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._info = {}
+        self._in_use = 0
+        self._closed = False
+        self.launches = 0
+        self.recycled = 0
+        self.unhealthy = 0
+
+    def _launch(self):
+        driver = self.create()
+        if driver is None:
+            return None
+        with self._cond:
+            self.launches += 1
+            self._info[id(driver)] = {'uses': 0, 'baseline': None, 'started': time.time(),
+                                      'pid': driver_pid(driver)}
+        return driver
+
+    def _discard(self, driver, reason):
+        with self._cond:
+            self._info.pop(id(driver), None)
+            self.recycled += 1
+        print(f"♻️ 回收浏览器: {reason}")
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def fill(self):
+        """预先启动浏览器直到池满，返回新启动的数量"""
+        started = 0
+        while True:
+            with self._cond:
+                if self._closed or len(self._idle) + self._in_use >= self.size:
+                    return started
+                # 先占位，避免并发调用超出池大小
+                self._in_use += 1
+            driver = self._launch()
+            with self._cond:
+                self._in_use -= 1
+                if driver is None:
+                    return started
+                self._idle.append(driver)
+                self._cond.notify()
+            started += 1
+
+    def acquire(self, timeout=None):
+        """取出一个健康的浏览器；池中没有空闲浏览器且未满时启动新的"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._in_use + len(self._idle) >= self.size:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+                driver = self._idle.popleft() if self._idle else None
+                self._in_use += 1
+            if driver is None:
+                driver = self._launch()
+                if driver is None:
+                    self._release_slot()
+                    return None
+            elif not is_healthy(driver):
+                with self._cond:
+                    self.unhealthy += 1
+                self._discard(driver, "健康检查失败")
+                self._release_slot()
+                continue
+            with self._cond:
+                info = self._info.get(id(driver))
+                if info is not None:
+                    info['uses'] += 1
+            return driver
+
+    def _release_slot(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    def release(self, driver):
+        """归还浏览器: 达到使用上限或内存增长过多时回收，否则重置状态后放回"""
+        with self._cond:
+            info = dict(self._info.get(id(driver), {}))
+        reason = None
+        if self._closed:
+            reason = "浏览器池已关闭"
+        elif info.get('uses', 0) >= self.max_uses:
+            reason = f"已使用 {info['uses']} 次"
+        else:
+            rss = process_tree_rss(driver_pid(driver)) if driver_pid(driver) else None
+            if rss is not None:
+                if info.get('baseline') is None:
+                    with self._cond:
+                        if id(driver) in self._info:
+                            self._info[id(driver)]['baseline'] = rss
+                elif rss - info['baseline'] > self.max_growth:
+                    reason = f"内存增长 {(rss - info['baseline']) / MB:.0f} MB"
+        if reason is None:
+            try:
+                self.reset(driver)
+            except Exception as e:
+                reason = f"状态重置失败 ({str(e)[:60]})"
+        if reason is not None:
+            self._discard(driver, reason)
+            self._release_slot()
+            return
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append(driver)
+            self._cond.notify()
+
+    def check_idle(self):
+        """检查空闲浏览器的健康状态，回收失效的浏览器，返回回收数量"""
+        with self._cond:
+            drivers = list(self._idle)
+            self._idle.clear()
+            self._in_use += len(drivers)
+        removed = 0
+        for driver in drivers:
+            if is_healthy(driver):
+                with self._cond:
+                    self._in_use -= 1
+                    self._idle.append(driver)
+                    self._cond.notify()
+            else:
+                with self._cond:
+                    self.unhealthy += 1
+                self._discard(driver, "空闲健康检查失败")
+                self._release_slot()
+                removed += 1
+        return removed
+
+    def pids(self):
+        """池中所有浏览器的驱动进程号 (用于登记到新一轮的内存控制器)"""
+        with self._cond:
+            return [info['pid'] for info in self._info.values() if info['pid']]
+
+    def status(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'launches': self.launches,
+                'recycled': self.recycled,
+                'unhealthy': self.unhealthy,
+                'uses': sorted(info['uses'] for info in self._info.values()),
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            drivers = list(self._idle)
+            self._idle.clear()
+            self._info.clear()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        if drivers:
+            print(f"🔒 已关闭浏览器池中的 {len(drivers)} 个浏览器")
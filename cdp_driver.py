@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CDP 直连驱动 - 不经过 chromedriver，通过 DevTools websocket 直接控制 Chrome
+
+一个 Chrome 进程、一条 websocket 连接 (asyncio，后台线程运行事件循环)，每个账号一个独立的
+浏览器上下文 (Cookie 和存储互相隔离) 和标签页，所有标签页的命令在同一条连接上按 sessionId 复用。
+CdpPage 提供登录流程用到的 WebDriver 接口子集 (get、execute_script、execute_cdp_cmd、
+find_element、get_log、截图等)，元素对象支持 click、send_keys、clear，登录代码无需区分两种驱动。
+
+需要 websockets 包；未安装或 Chrome 启动失败时调用方回退到 Selenium。
+"""
+
+import asyncio
+import base64
+import concurrent.futures
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+
+from selenium.common.exceptions import (
+    ElementNotInteractableException,
+    JavascriptException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+
+# chromedriver 默认会加的开关中与登录相关的部分
+DEFAULT_FLAGS = [
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--disable-background-networking',
+    '--disable-popup-blocking',
+    '--password-store=basic',
+    '--use-mock-keychain',
+]
+
+# 性能日志和控制台日志在内存中保留的条数
+LOG_LIMIT = 10000
+
+# 隔离环境 (isolated world) 的名称: 脚本与页面共享 DOM，但全局变量互不可见
+WORLD_NAME = 'netlib'
+
+# 元素登记表保存在隔离环境中，页面脚本无法读取；每个文档一个随机令牌，跳转后旧元素的令牌不匹配即为失效
+EXECUTE_JS = """(() => {
+const key = Symbol.for('netlib.elements');
+const registry = window[key] || (window[key] = {token: Math.random().toString(36).slice(2), nodes: []});
+const revive = (value) => {
+    if (Array.isArray(value)) return value.map(revive);
+    if (value && typeof value === 'object') {
+        if ('__netlibElement' in value) {
+            const [token, index] = value.__netlibElement;
+            if (token !== registry.token || !registry.nodes[index] || !registry.nodes[index].isConnected)
+                throw new Error('stale element reference');
+            return registry.nodes[index];
+        }
+        const out = {};
+        for (const name of Object.keys(value)) out[name] = revive(value[name]);
+        return out;
+    }
+    return value;
+};
+const seen = new Map();
+const pack = (value, depth = 0) => {
+    if (value === undefined || value === null || depth > 32) return null;
+    if (typeof Node !== 'undefined' && value instanceof Node) {
+        if (!seen.has(value)) {
+            let index = registry.nodes.indexOf(value);
+            if (index < 0) index = registry.nodes.push(value) - 1;
+            seen.set(value, index);
+        }
+        return {__netlibElement: [registry.token, seen.get(value)]};
+    }
+    if (Array.isArray(value) || value instanceof NodeList || value instanceof HTMLCollection)
+        return Array.from(value, (item) => pack(item, depth + 1));
+    if (typeof value === 'object') {
+        const out = {};
+        for (const name of Object.keys(value)) out[name] = pack(value[name], depth + 1);
+        return out;
+    }
+    return value;
+};
+const args = revive(%s);
+return pack((function() { %s
+}).apply(window, args));
+})()"""
+
+# 按定位方式查找元素，与 Selenium 的 By 取值相同
+FIND_JS = """
+const [by, value, root, all] = arguments;
+const scope = root || document;
+let nodes;
+switch (by) {
+    case 'xpath': {
+        const snapshot = document.evaluate(value, scope, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        nodes = [];
+        for (let i = 0; i < snapshot.snapshotLength; i++) nodes.push(snapshot.snapshotItem(i));
+        break;
+    }
+    case 'css selector': nodes = Array.from(scope.querySelectorAll(value)); break;
+    case 'id': nodes = Array.from(scope.querySelectorAll('[id="' + CSS.escape(value) + '"]')); break;
+    case 'name': nodes = Array.from(scope.querySelectorAll('[name="' + CSS.escape(value) + '"]')); break;
+    case 'tag name': nodes = Array.from(scope.getElementsByTagName(value)); break;
+    case 'class name': nodes = Array.from(scope.getElementsByClassName(value)); break;
+    case 'link text':
+    case 'partial link text': {
+        const text = (a) => (a.innerText || a.textContent || '').trim();
+        nodes = Array.from(scope.querySelectorAll('a')).filter(
+            a => by === 'link text' ? text(a) === value : text(a).includes(value));
+        break;
+    }
+    default: throw new Error('unsupported locator: ' + by);
+}
+return all ? nodes : (nodes[0] || null);
+"""
+
+CLEAR_JS = """
+const el = arguments[0];
+const proto = Object.getPrototypeOf(el);
+const setter = Object.getOwnPropertyDescriptor(proto, 'value');
+if (setter && setter.set) setter.set.call(el, ''); else el.value = '';
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+"""
+
+CLICK_POINT_JS = """
+const el = arguments[0];
+el.scrollIntoView({block: 'center', inline: 'center'});
+const r = el.getBoundingClientRect();
+return [r.left + r.width / 2, r.top + r.height / 2, r.width, r.height];
+"""
+
+
+class CdpConnection:
+    """一条 DevTools websocket 连接: 后台线程运行事件循环，命令按 id 匹配响应，事件按 sessionId 分发"""
+
+    def __init__(self, url, timeout=30):
+        from websockets.asyncio.client import connect
+
+        self.url = url
+        self.timeout = timeout
+        self._connect = connect
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._listeners = {}
+        self._ws = None
+        self.closed = False
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='cdp-connection', daemon=True)
+        self._thread.start()
+        self._call(self._open(), timeout)
+
+    def _call(self, coroutine, timeout):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def _open(self):
+        self._ws = await self._connect(self.url, max_size=None, ping_interval=None)
+        self.loop.create_task(self._read_loop())
+
+    async def _read_loop(self):
+        try:
+            async for raw in self._ws:
+                message = json.loads(raw)
+                if 'id' in message:
+                    future = self._pending.pop(message['id'], None)
+                    if future is None or future.done():
+                        continue
+                    if 'error' in message:
+                        error = message['error']
+                        future.set_exception(WebDriverException(f"{error.get('message')} ({error.get('code')})"))
+                    else:
+                        future.set_result(message.get('result', {}))
+                else:
+                    listener = self._listeners.get(message.get('sessionId'))
+                    if listener is not None:
+                        try:
+                            listener(message['method'], message.get('params', {}))
+                        except Exception:
+                            pass
+        except Exception:
+            pass
+        finally:
+            self.closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(WebDriverException('DevTools 连接已断开'))
+            self._pending.clear()
+
+    async def send_async(self, method, params=None, session_id=None):
+        if self.closed:
+            raise WebDriverException('DevTools 连接已断开')
+        message_id = next(self._ids)
+        message = {'id': message_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        future = self.loop.create_future()
+        self._pending[message_id] = future
+        try:
+            await self._ws.send(json.dumps(message))
+            return await future
+        finally:
+            self._pending.pop(message_id, None)
+
+    def send(self, method, params=None, session_id=None, timeout=None):
+        """在调用线程中同步发送一条命令并等待响应"""
+        try:
+            return self._call(self.send_async(method, params, session_id), timeout or self.timeout)
+        except concurrent.futures.TimeoutError:
+            raise TimeoutException(f"DevTools 命令超时: {method}")
+
+    def post(self, method, params=None, session_id=None):
+        """在事件循环线程中发送命令，不等待响应 (用于事件回调)"""
+        task = self.loop.create_task(self.send_async(method, params, session_id))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def listen(self, session_id, callback):
+        self._listeners[session_id] = callback
+
+    def unlisten(self, session_id):
+        self._listeners.pop(session_id, None)
+
+    def close(self):
+        async def shutdown():
+            if self._ws is not None:
+                await self._ws.close()
+
+        if self.loop.is_running():
+            try:
+                self._call(shutdown(), 5)
+            except Exception:
+                pass
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(5)
+        self.closed = True
+
+
+class CdpBrowser:
+    """启动一个 Chrome 进程并建立唯一的 DevTools 连接，按需创建隔离的标签页"""
+
+    def __init__(self, binary, arguments=(), user_data_dir=None, launch_timeout=20):
+        self._own_profile = user_data_dir is None
+        self.user_data_dir = user_data_dir or tempfile.mkdtemp(prefix='netlib-cdp-')
+        port_file = os.path.join(self.user_data_dir, 'DevToolsActivePort')
+        if os.path.exists(port_file):
+            os.remove(port_file)
+        flags = [arg if arg.startswith('-') else f'--{arg}' for arg in arguments]
+        command = [binary, '--remote-debugging-port=0', f'--user-data-dir={self.user_data_dir}',
+                   *DEFAULT_FLAGS, *flags, 'about:blank']
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self._lock = threading.Lock()
+        self.pages = 0
+        try:
+            self.connection = CdpConnection(self._browser_url(port_file, launch_timeout))
+            self.version = self.connection.send('Browser.getVersion')
+        except Exception:
+            self._terminate()
+            raise
+
+    def _browser_url(self, port_file, timeout):
+        """Chrome 把实际端口和浏览器 websocket 路径写到 DevToolsActivePort"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise WebDriverException(f"Chrome 启动后立即退出 (退出码 {self.process.returncode})")
+            try:
+                with open(port_file, 'r', encoding='utf-8') as f:
+                    lines = f.read().split()
+                if len(lines) >= 2:
+                    return f"ws://127.0.0.1:{lines[0]}{lines[1]}"
+            except OSError:
+                pass
+            time.sleep(0.05)
+        raise TimeoutException(f"{timeout} 秒内未获得 DevTools 端口")
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def open_target(self):
+        """在新的浏览器上下文中打开一个标签页并附加，返回 (上下文, 标签页, 会话) 的 id"""
+        send = self.connection.send
+        context = send('Target.createBrowserContext', {'disposeOnDetach': True})['browserContextId']
+        try:
+            target = send('Target.createTarget', {'url': 'about:blank', 'browserContextId': context})['targetId']
+            session = send('Target.attachToTarget', {'targetId': target, 'flatten': True})['sessionId']
+        except Exception:
+            send('Target.disposeBrowserContext', {'browserContextId': context})
+            raise
+        with self._lock:
+            self.pages += 1
+        return context, target, session
+
+    def new_page(self):
+        return CdpPage(self)
+
+    def alive(self):
+        return self.process.poll() is None and not self.connection.closed
+
+    def _terminate(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self._own_profile:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+    def close(self):
+        try:
+            self.connection.send('Browser.close', timeout=5)
+        except Exception:
+            pass
+        self.connection.close()
+        self._terminate()
+
+
+class CdpElement:
+    """页面元素句柄，操作通过所在标签页执行"""
+
+    def __init__(self, page, token, index):
+        self.page = page
+        self.token = token
+        self.index = index
+
+    def _script(self, script, *args):
+        return self.page.execute_script(script, self, *args)
+
+    def click(self):
+        """滚动到可见后在元素中心派发真实的鼠标按下和抬起事件"""
+        x, y, width, height = self._script(CLICK_POINT_JS)
+        if not width and not height:
+            raise ElementNotInteractableException("元素不可见，无法点击")
+        for event in ('mousePressed', 'mouseReleased'):
+            self.page.execute('Input.dispatchMouseEvent', {
+                'type': event, 'x': x, 'y': y, 'button': 'left', 'clickCount': 1,
+            })
+
+    def send_keys(self, text):
+        """聚焦元素后逐个字符派发键盘按下和抬起 (产生 keydown/keypress/input/keyup 事件)"""
+        self._script("arguments[0].focus();")
+        for char in str(text):
+            self.page.execute('Input.dispatchKeyEvent', {
+                'type': 'keyDown', 'key': char, 'text': char, 'unmodifiedText': char,
+            })
+            self.page.execute('Input.dispatchKeyEvent', {'type': 'keyUp', 'key': char})
+
+    def clear(self):
+        self._script(CLEAR_JS)
+
+    def get_attribute(self, name):
+        return self._script(
+            "const el = arguments[0]; const name = arguments[1];"
+            "return name in el && typeof el[name] !== 'function' && typeof el[name] !== 'object'"
+            " ? el[name] : el.getAttribute(name);", name)
+
+    def get_property(self, name):
+        return self._script("return arguments[0][arguments[1]];", name)
+
+    def is_displayed(self):
+        return self._script(
+            "const el = arguments[0];"
+            "return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);")
+
+    def is_enabled(self):
+        return not self._script("return !!arguments[0].disabled;")
+
+    @property
+    def text(self):
+        return self._script("return (arguments[0].innerText || '').trim();")
+
+    @property
+    def tag_name(self):
+        return self._script("return arguments[0].tagName.toLowerCase();")
+
+    def find_element(self, by, value):
+        return self.page._find(by, value, self, False)
+
+    def find_elements(self, by, value):
+        return self.page._find(by, value, self, True)
+
+
+class CdpPage:
+    """一个标签页的同步驱动接口，方法名和返回值与 Selenium WebDriver 一致"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.connection = browser.connection
+        self.page_load_strategy = 'normal'
+        self.page_load_timeout = 30.0
+        self._lifecycle = threading.Condition()
+        self._loaded = {}
+        self._performance = deque(maxlen=LOG_LIMIT)
+        self._console = deque(maxlen=LOG_LIMIT)
+        self._quit = False
+        self._world = None
+        self._attach(*browser.open_target())
+
+    def _attach(self, context, target, session):
+        """开始接收该会话的事件并开启需要的 CDP 域"""
+        self.context, self.target, self.session = context, target, session
+        self._world = None
+        self.connection.listen(session, self._on_event)
+        for method, params in (('Page.enable', {}), ('Page.setLifecycleEventsEnabled', {'enabled': True}),
+                               ('Network.enable', {}), ('Runtime.enable', {}), ('Log.enable', {})):
+            self.execute(method, params)
+
+    def execute(self, method, params=None):
+        """发送一条 CDP 命令 (每条命令一次 websocket 往返)"""
+        if self._quit:
+            raise WebDriverException('标签页已关闭')
+        return self.connection.send(method, params, self.session)
+
+    def _on_event(self, method, params):
+        """在连接线程中处理事件: 记录网络事件和控制台输出，自动关闭对话框"""
+        if method.startswith('Network.'):
+            self._performance.append({
+                'level': 'INFO', 'timestamp': int(time.time() * 1000),
+                'message': json.dumps({'message': {'method': method, 'params': params}}),
+            })
+        elif method == 'Page.lifecycleEvent':
+            with self._lifecycle:
+                self._loaded.setdefault(params.get('loaderId'), set()).add(params.get('name'))
+                self._lifecycle.notify_all()
+        elif method == 'Runtime.consoleAPICalled':
+            text = ' '.join(str(arg.get('value', arg.get('description', ''))) for arg in params.get('args', []))
+            level = {'error': 'SEVERE', 'warning': 'WARNING'}.get(params.get('type'), 'INFO')
+            self._console.append({'level': level, 'message': f"console-api {text}",
+                                  'timestamp': int(params.get('timestamp', time.time() * 1000))})
+        elif method == 'Log.entryAdded':
+            entry = params.get('entry', {})
+            level = {'error': 'SEVERE', 'warning': 'WARNING'}.get(entry.get('level'), 'INFO')
+            self._console.append({'level': level, 'message': f"{entry.get('url', '')} {entry.get('text', '')}".strip(),
+                                  'timestamp': int(entry.get('timestamp', time.time() * 1000))})
+        elif method == 'Runtime.executionContextDestroyed':
+            if params.get('executionContextId') == self._world:
+                self._world = None
+        elif method == 'Runtime.executionContextsCleared':
+            self._world = None
+        elif method == 'Page.javascriptDialogOpening':
+            self.connection.post('Page.handleJavaScriptDialog', {'accept': True}, self.session)
+
+    # 导航
+
+    def set_page_load_timeout(self, seconds):
+        self.page_load_timeout = seconds
+
+    def get(self, url):
+        """导航并按页面加载策略等待: normal 等 load，eager 等 DOMContentLoaded，none 不等待"""
+        result = self.execute('Page.navigate', {'url': url})
+        if result.get('errorText'):
+            raise WebDriverException(f"页面加载失败: {result['errorText']}")
+        loader = result.get('loaderId')
+        if not loader or self.page_load_strategy == 'none':
+            return
+        event = 'DOMContentLoaded' if self.page_load_strategy == 'eager' else 'load'
+        with self._lifecycle:
+            reached = self._lifecycle.wait_for(lambda: event in self._loaded.get(loader, ()),
+                                               self.page_load_timeout)
+            self._loaded = {loader: self._loaded.get(loader, set())}
+        if not reached:
+            raise TimeoutException(f"页面加载超时 ({self.page_load_timeout:g} 秒): {url}")
+
+    @property
+    def current_url(self):
+        return self.execute_script("return location.href;")
+
+    @property
+    def title(self):
+        return self.execute_script("return document.title;")
+
+    @property
+    def page_source(self):
+        return self.execute_script("return document.documentElement ? document.documentElement.outerHTML : '';")
+
+    # 脚本和元素
+
+    def _encode(self, value):
+        if isinstance(value, CdpElement):
+            return {'__netlibElement': [value.token, value.index]}
+        if isinstance(value, (list, tuple)):
+            return [self._encode(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self._encode(item) for key, item in value.items()}
+        return value
+
+    def _decode(self, value):
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        if isinstance(value, dict):
+            if '__netlibElement' in value:
+                return CdpElement(self, *value['__netlibElement'])
+            return {key: self._decode(item) for key, item in value.items()}
+        return value
+
+    def _world_id(self):
+        """当前文档主框架中的隔离环境，跳转后随旧文档销毁，下次执行脚本时重新创建"""
+        world = self._world
+        if world is None:
+            world = self.execute('Page.createIsolatedWorld', {
+                'frameId': self.target, 'worldName': WORLD_NAME, 'grantUniveralAccess': True,
+            })['executionContextId']
+            self._world = world
+        return world
+
+    def _evaluate(self, expression):
+        world = self._world_id()
+        try:
+            return self.execute('Runtime.evaluate', {
+                'expression': expression, 'contextId': world, 'returnByValue': True,
+            })
+        except WebDriverException as e:
+            if 'context' not in str(e).lower():
+                raise
+            # 销毁事件还没到达时隔离环境已随跳转失效，重新创建后再试一次
+            if self._world == world:
+                self._world = None
+            return self.execute('Runtime.evaluate', {
+                'expression': expression, 'contextId': self._world_id(), 'returnByValue': True,
+            })
+
+    def execute_script(self, script, *args):
+        """与 Selenium 相同的语义: script 是函数体，arguments 为参数，元素可作为参数和返回值
+
+        脚本在隔离环境中执行: 可以读写 DOM，但看不到页面的全局变量，页面也看不到元素登记表。
+        """
+        expression = EXECUTE_JS % (json.dumps(self._encode(list(args))), script)
+        result = self._evaluate(expression)
+        details = result.get('exceptionDetails')
+        if details:
+            message = (details.get('exception') or {}).get('description') or details.get('text', '')
+            if 'stale element reference' in message:
+                raise StaleElementReferenceException(message)
+            raise JavascriptException(message)
+        return self._decode(result.get('result', {}).get('value'))
+
+    def _find(self, by, value, root, all_matches):
+        found = self.execute_script(FIND_JS, by, value, root, all_matches)
+        if not all_matches and found is None:
+            raise NoSuchElementException(f"找不到元素: {by}={value}")
+        return found
+
+    def find_element(self, by, value):
+        return self._find(by, value, None, False)
+
+    def find_elements(self, by, value):
+        return self._find(by, value, None, True)
+
+    # CDP、日志和截图
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        return self.execute(cmd, cmd_args)
+
+    def get_log(self, log_type):
+        """读取并清空日志: performance 为网络事件 (与 chromedriver 格式相同)，browser 为控制台输出"""
+        source = {'performance': self._performance, 'browser': self._console}.get(log_type)
+        if source is None:
+            raise WebDriverException(f"不支持的日志类型: {log_type}")
+        entries = []
+        while source:
+            entries.append(source.popleft())
+        return entries
+
+    def get_screenshot_as_png(self):
+        return base64.b64decode(self.execute('Page.captureScreenshot', {'format': 'png'})['data'])
+
+    def reset(self):
+        """换用新的浏览器上下文和标签页，丢弃 Cookie、存储和页面状态"""
+        old = (self.context, self.session)
+        self._dispose(*old)
+        with self._lifecycle:
+            self._loaded.clear()
+        self._performance.clear()
+        self._console.clear()
+        self._attach(*self.browser.open_target())
+
+    def _dispose(self, context, session):
+        self.connection.unlisten(session)
+        try:
+            self.connection.send('Target.disposeBrowserContext', {'browserContextId': context}, timeout=10)
+        except Exception:
+            pass
+
+    def quit(self):
+        """关闭标签页和它的浏览器上下文，Chrome 进程由 CdpBrowser 统一关闭"""
+        if self._quit:
+            return
+        self._quit = True
+        if not self.connection.closed:
+            self._dispose(self.context, self.session)
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+签到守护进程 - 常驻运行，按 cron 表达式定时签到，浏览器在各轮之间保持预热
+
+用法:
+  python checkin_daemon.py --schedule "0 8,20 * * *" --status-port 8765
+  python checkin_daemon.py --once            # 立即运行一轮后退出
+  curl http://127.0.0.1:8765/status          # 队列深度、上一轮结果、各阶段耗时分位数
+
+浏览器池大小等于 NETLIB_WORKERS；单个浏览器使用 NETLIB_POOL_MAX_USES 次 (默认 50)
+或内存增长超过 NETLIB_POOL_MAX_GROWTH_MB (默认 200) 后回收重建。
+账号来源和其他 NETLIB_* 设置与 fixed_browser_login.py 相同，每一轮重新读取账号来源。
+"""
+
+import argparse
+import datetime
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import fixed_browser_login as login
+from account_sources import iter_valid_accounts, open_account_source
+from browser_pool import BrowserPool
+from login_metrics import close_tracing, configure_tracing_from_env, enable_metrics, get_records, summarize
+from memory_control import MB
+
+# 每个字段的取值范围: 分 时 日 月 星期 (0 和 7 都表示星期日)
+CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+def parse_cron_field(field, low, high):
+    """解析单个 cron 字段，支持 *、数字、a-b 范围、逗号列表和 /步长"""
+    values = set()
+    for part in field.split(','):
+        expr, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if step < 1:
+            raise ValueError(f"步长必须为正数: {part}")
+        if expr == '*':
+            start, end = low, high
+        elif '-' in expr:
+            start, end = (int(x) for x in expr.split('-', 1))
+        else:
+            start = int(expr)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"取值超出范围 {low}-{high}: {part}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """五字段 cron 表达式: 分 时 日 月 星期"""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron 表达式应为 5 个字段: {expression}")
+        self.expression = expression
+        (self.minutes, self.hours, self.days, self.months,
+         weekdays) = (parse_cron_field(f, *r) for f, r in zip(fields, CRON_FIELDS))
+        self.weekdays = {d % 7 for d in weekdays}
+        # 日和星期都有限制时满足其一即可 (与 cron 一致)
+        self.any_day = fields[2] == '*'
+        self.any_weekday = fields[4] == '*'
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        """moment 之后 (不含) 的下一个触发时间"""
+        candidate = moment.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        limit = candidate + datetime.timedelta(days=366 * 4)
+        while candidate < limit:
+            if candidate.month not in self.months or not self._day_matches(candidate):
+                candidate = (candidate + datetime.timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + datetime.timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += datetime.timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"cron 表达式没有可触发的时间: {self.expression}")
+
+
+def env_number(name, default):
+    value = os.environ.get(name, '').strip()
+    try:
+        return float(value) if value else default
+    except ValueError:
+        print(f"⚠️ {name} 无效: {value}，使用默认值 {default}")
+        return default
+
+
+class CheckinDaemon:
+    """定时运行签到轮次，并维护状态接口需要的数据"""
+
+    def __init__(self, schedule, workers):
+        self.schedule = schedule
+        self.workers = workers
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.state = 'idle'
+        self.next_run = None
+        self.rounds = 0
+        self.current_round = None
+        self.last_round = None
+        self.pool = BrowserPool(
+            workers, login.create_driver, login.reset_browser_state,
+            max_uses=int(env_number('NETLIB_POOL_MAX_USES', 50)),
+            max_growth=env_number('NETLIB_POOL_MAX_GROWTH_MB', 200) * MB,
+        )
+
+    def status(self):
+        """状态接口返回的 JSON 数据"""
+        read, done = login.get_progress()
+        with self.lock:
+            running = self.current_round is not None
+            data = {
+                'state': self.state,
+                'schedule': self.schedule.expression if self.schedule else None,
+                'next_run': self.next_run.isoformat(timespec='seconds') if self.next_run else None,
+                'rounds': self.rounds,
+                'queue_depth': read - done if running else 0,
+                'current_round': dict(self.current_round, read=read, done=done) if running else None,
+                'last_round': self.last_round,
+            }
+        latency = {}
+        for name, stats in summarize(get_records()).items():
+            latency[name] = {'count': stats['count'], 'failed': stats['failed']}
+            latency[name].update((key, round(stats[key] * 1000, 1)) for key in ('p50', 'p95', 'p99'))
+        data['latency_ms'] = latency
+        data['pool'] = self.pool.status()
+        return data
+
+    def run_round(self):
+        """运行一轮签到，返回退出码 (与单次运行相同: 0/2/1)"""
+        source = open_account_source()
+        if not source:
+            print("❌ 未找到账号配置，跳过本轮")
+            return 1
+        description, items = source
+        started = time.time()
+        login.reset_run_stats()
+        login.reset_circuit_breaker()
+        login.configure_deadline()
+        enable_metrics()
+        with self.lock:
+            self.state = 'running'
+            self.current_round = {'started': datetime.datetime.fromtimestamp(started).isoformat(timespec='seconds')}
+        print(f"\n{'=' * 60}")
+        print(f"开始第 {self.rounds + 1} 轮签到 ({time.strftime('%Y-%m-%d %H:%M:%S')})，账号来源: {description}")
+        print(f"{'=' * 60}")
+        try:
+            accounts = login.guard_account_stream(iter_valid_accounts(items))
+            results = login.run_accounts(login.prioritize_accounts(accounts), self.workers)
+            login.report_memory_usage()
+            login.report_deadline()
+            login.save_selector_cache()
+            login.save_checkin_state()
+            exit_code = login.report_results(results)
+        except Exception as e:
+            print(f"❌ 本轮签到异常: {str(e)}")
+            traceback.print_exc()
+            results, exit_code = [], 1
+        finished = time.time()
+        with self.lock:
+            self.rounds += 1
+            self.state = 'stopping' if self.stop_event.is_set() else 'idle'
+            self.current_round = None
+            self.last_round = {
+                'started': datetime.datetime.fromtimestamp(started).isoformat(timespec='seconds'),
+                'finished': datetime.datetime.fromtimestamp(finished).isoformat(timespec='seconds'),
+                'duration': round(finished - started, 3),
+                'exit_code': exit_code,
+                'counts': dict(Counter(status for _, status in results)),
+                'results': [{'username': username, 'status': status} for username, status in results],
+            }
+        return exit_code
+
+    def prepare_pool(self):
+        """预热浏览器池 (只有浏览器后端需要)"""
+        if login.get_backend() == 'http':
+            return
+        started = self.pool.fill()
+        if started:
+            print(f"🔥 浏览器池已预热: 新启动 {started} 个，共 {self.pool.status()['idle']} 个空闲")
+
+    def wait_until(self, moment, check_interval):
+        """等待到指定时间，期间定期检查空闲浏览器；收到停止信号时返回 False"""
+        while not self.stop_event.is_set():
+            remaining = (moment - datetime.datetime.now()).total_seconds()
+            if remaining <= 0:
+                return True
+            if self.stop_event.wait(min(remaining, check_interval)):
+                break
+            removed = self.pool.check_idle()
+            if removed:
+                print(f"⚠️ 空闲浏览器健康检查回收 {removed} 个")
+                self.prepare_pool()
+        return False
+
+    def serve(self, run_now=False):
+        check_interval = env_number('NETLIB_POOL_CHECK_INTERVAL', 60)
+        self.prepare_pool()
+        if run_now:
+            self.run_round()
+        while not self.stop_event.is_set():
+            self.prepare_pool()
+            with self.lock:
+                self.next_run = self.schedule.next_after(datetime.datetime.now())
+            print(f"⏰ 下一轮签到: {self.next_run.strftime('%Y-%m-%d %H:%M')}")
+            if not self.wait_until(self.next_run, check_interval):
+                break
+            with self.lock:
+                self.next_run = None
+            self.run_round()
+
+    def stop(self):
+        with self.lock:
+            self.state = 'stopping'
+        self.stop_event.set()
+
+
+def start_status_server(daemon, host, port):
+    """在后台线程中提供 GET /status (JSON) 和 GET /health"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path in ('/', '/status'):
+                body = json.dumps(daemon.status(), ensure_ascii=False, indent=2).encode('utf-8')
+                status = 200
+            elif path == '/health':
+                body = b'ok'
+                status = 200
+            else:
+                body = b'not found'
+                status = 404
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8' if path != '/health' else 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name='status-server', daemon=True).start()
+    return httpd
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='签到守护进程')
+    parser.add_argument('--schedule', default=os.environ.get('NETLIB_SCHEDULE', '0 8 * * *'),
+                        help='cron 表达式 (分 时 日 月 星期)，默认每天 8:00')
+    parser.add_argument('--status-host', default=os.environ.get('NETLIB_STATUS_HOST', '127.0.0.1'))
+    parser.add_argument('--status-port', type=int, default=int(os.environ.get('NETLIB_STATUS_PORT', '8765')),
+                        help='状态接口端口，0 表示不启动')
+    parser.add_argument('--run-now', action='store_true', help='启动后立即运行一轮，然后按计划运行')
+    parser.add_argument('--once', action='store_true', help='立即运行一轮后退出')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        schedule = CronSchedule(args.schedule)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("签到守护进程")
+    print(f"启动时间: {time.strftime('%Y-%m-%d %H:%M:%S')}  计划: {schedule.expression}")
+    print("=" * 60)
+
+    configure_tracing_from_env()
+    login.configure_checkin_state()
+    daemon = CheckinDaemon(schedule, login.get_worker_count())
+    login.set_browser_pool(daemon.pool)
+
+    httpd = None
+    if args.status_port:
+        httpd = start_status_server(daemon, args.status_host, args.status_port)
+        print(f"📡 状态接口: http://{args.status_host}:{httpd.server_address[1]}/status")
+
+    def handle_signal(signum, frame):
+        print(f"\n🛑 收到信号 {signum}，当前轮次结束后退出")
+        daemon.stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    exit_code = 0
+    try:
+        if args.once:
+            daemon.prepare_pool()
+            exit_code = daemon.run_round()
+        else:
+            daemon.serve(run_now=args.run_now)
+    finally:
+        daemon.pool.close()
+        login.set_browser_pool(None)
+        login.close_cdp_browser()
+        login.close_profile_template()
+        if httpd is not None:
+            httpd.shutdown()
+            httpd.server_close()
+        close_tracing()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+签到状态存储 - 按用户名记录最近一次成功时间、结果和耗时，用于增量签到
+"""
+
+import json
+import os
+import threading
+import time
+
+# 每个账号在结果列表中的状态
+STATUS_SUCCESS = 'success'
+STATUS_FAILED = 'failed'
+STATUS_FRESH = 'fresh'
+# 时间预算不足而没有开始登录
+STATUS_DEFERRED = 'deferred'
+
+# 退出码按成功处理的状态
+SUCCESS_STATUSES = (STATUS_SUCCESS, STATUS_FRESH)
+
+
+class StateStore:
+    """JSON 文件形式的状态存储: {用户名: {last_success, last_outcome, last_latency, last_attempt}}"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._entries = dict(json.load(f).get('accounts', {}))
+                print(f"✅ 已加载签到状态: {path} ({len(self._entries)} 个账号)")
+            except Exception as e:
+                print(f"⚠️ 签到状态读取失败，忽略: {str(e)[:80]}")
+
+    def get(self, username):
+        with self._lock:
+            entry = self._entries.get(username)
+            return dict(entry) if entry else None
+
+    def is_fresh(self, username, window_seconds, now=None):
+        """最近一次成功是否仍在新鲜窗口内"""
+        entry = self.get(username)
+        if not entry or not entry.get('last_success'):
+            return False
+        now = time.time() if now is None else now
+        return now - entry['last_success'] < window_seconds
+
+    def record(self, username, success, latency):
+        """记录一次登录尝试的结果"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.setdefault(username, {})
+            entry['last_attempt'] = now
+            entry['last_outcome'] = STATUS_SUCCESS if success else STATUS_FAILED
+            entry['last_latency'] = round(latency, 3)
+            if success:
+                entry['last_success'] = now
+            self._dirty = True
+
+    def save(self):
+        """原子写回状态文件，没有变更时跳过"""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'accounts': self._entries}, f,
+                          ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+def incremental_from_env():
+    """增量模式设置: NETLIB_INCREMENTAL 开启时返回新鲜窗口秒数 (NETLIB_FRESH_HOURS，默认 20 小时)，否则返回 None"""
+    if os.environ.get('NETLIB_INCREMENTAL', '').strip().lower() not in ('1', 'true', 'yes'):
+        return None
+    value = os.environ.get('NETLIB_FRESH_HOURS', '').strip()
+    try:
+        hours = float(value) if value else 20.0
+    except ValueError:
+        print(f"⚠️ NETLIB_FRESH_HOURS 无效: {value}，使用默认值 20")
+        hours = 20.0
+    return max(0.0, hours) * 3600
+
+
+def state_from_env(shard=None):
+    """根据 NETLIB_STATE_FILE 创建状态存储 (默认 checkin_state.json，设为空禁用)
+
+    分片模式下默认每个分片使用独立的文件，避免并行进程互相覆盖。
+    """
+    default = 'checkin_state.json'
+    if shard:
+        default = f"checkin_state_shard_{shard[0]}_of_{shard[1]}.json"
+    path = os.environ.get('NETLIB_STATE_FILE', default).strip()
+    if not path:
+        return None
+    return StateStore(path)
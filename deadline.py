@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时间预算调度 - 在工作流超时之前停止开始新的登录，总能留出时间写汇总和结果文件
+
+NETLIB_TIME_BUDGET 设置后开启:
+  NETLIB_TIME_BUDGET         整个脚本可用的秒数 (应小于工作流的 timeout-minutes)
+  NETLIB_TIME_RESERVE        为汇总和结果文件保留的秒数 (默认 30)
+  NETLIB_ACCOUNT_COST        没有历史数据时单个账号的估计耗时 (默认 60 秒)
+  NETLIB_PRIORITY            账号顺序: stale (默认，最久未成功的优先) 或 input (保持输入顺序)
+"""
+
+import os
+import threading
+import time
+
+
+class DeadlineScheduler:
+    """根据剩余时间和单账号耗时估计决定是否还能开始新的登录
+
+    耗时估计优先使用该账号上次的耗时 (签到状态)，其次使用本次运行中已完成账号的平均耗时，
+    都没有时使用默认值；估计值乘以安全系数。
+    """
+
+    def __init__(self, budget, reserve=30.0, default_cost=60.0, safety=1.2):
+        self.budget = budget
+        self.reserve = reserve
+        self.default_cost = default_cost
+        self.safety = safety
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._observed = 0
+        self._observed_total = 0.0
+        self.deferred = 0
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        """还可以用于登录的秒数 (已扣除保留时间)"""
+        return self.budget - self.reserve - self.elapsed()
+
+    def observe(self, seconds):
+        """记录一个已完成账号的实际耗时"""
+        with self._lock:
+            self._observed += 1
+            self._observed_total += seconds
+
+    def estimate(self, history=None):
+        with self._lock:
+            live = self._observed_total / self._observed if self._observed else None
+        cost = history or live or self.default_cost
+        return cost * self.safety
+
+    def can_start(self, history=None):
+        """返回 (是否可以开始, 估计耗时)"""
+        cost = self.estimate(history)
+        return self.remaining() >= cost, cost
+
+    def defer(self):
+        with self._lock:
+            self.deferred += 1
+
+
+def _env_seconds(name, default):
+    value = os.environ.get(name, '').strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"⚠️ {name} 无效: {value}，使用默认值 {default}")
+        return default
+
+
+def scheduler_from_env():
+    """NETLIB_TIME_BUDGET 未设置时返回 None"""
+    budget = _env_seconds('NETLIB_TIME_BUDGET', None)
+    if not budget or budget <= 0:
+        return None
+    return DeadlineScheduler(
+        budget,
+        reserve=_env_seconds('NETLIB_TIME_RESERVE', 30.0),
+        default_cost=_env_seconds('NETLIB_ACCOUNT_COST', 60.0),
+    )
+
+
+def priority_mode():
+    mode = os.environ.get('NETLIB_PRIORITY', 'stale').strip().lower()
+    if mode not in ('stale', 'input'):
+        print(f"⚠️ NETLIB_PRIORITY 无效: {mode}，使用 stale")
+        return 'stale'
+    return mode
+
+
+def order_by_staleness(accounts, state):
+    """从未成功的账号最先，其余按上次成功时间从早到晚，相同时保持输入顺序
+
+    排序需要读完整个账号流，只在开启时间预算时使用。
+    """
+    def last_success(account):
+        entry = state.get(account.username) if state is not None else None
+        return (entry or {}).get('last_success') or 0
+
+    return sorted(accounts, key=last_success)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器和驱动解析缓存 - 每个进程只探测一次 Chrome 与 ChromeDriver 的路径和版本，并持久化到磁盘
+
+缓存按文件 mtime 校验，浏览器或驱动被升级后自动重新探测。与浏览器主版本匹配的驱动
+固定保存在本地目录 (NETLIB_DRIVER_DIR，默认 drivers/<浏览器版本>/chromedriver)，
+冷启动时直接使用，不需要联网下载。
+  NETLIB_DRIVER_CACHE   解析结果缓存文件 (默认 driver_cache.json，设为空禁用持久化)
+  NETLIB_CHROMEDRIVER   指定驱动路径，优先于自动查找
+"""
+
+import glob
+import json
+import os
+import re
+import shutil
+import stat
+import subprocess
+from collections import namedtuple
+
+CHROME_PATHS = [
+    '/usr/bin/google-chrome',
+    '/usr/bin/chromium',
+    '/usr/bin/chromium-browser',
+    '/opt/google/chrome/chrome',
+    '/usr/local/bin/google-chrome',
+    '/snap/bin/chromium'
+]
+
+# Selenium Manager 和 webdriver-manager 下载驱动的缓存位置
+DRIVER_CACHE_GLOBS = [
+    '~/.cache/selenium/chromedriver/*/*/chromedriver',
+    '~/.wdm/drivers/chromedriver/*/*/chromedriver*/chromedriver',
+    '~/.wdm/drivers/chromedriver/*/*/chromedriver',
+]
+
+# browser/driver 为路径，未找到时为 None；版本为完整版本号字符串
+Resolution = namedtuple('Resolution', 'browser browser_version driver driver_version')
+
+_VERSION_RE = re.compile(r'(\d+)\.(\d+)\.(\d+)\.(\d+)')
+
+
+def probe_version(path):
+    """运行 <path> --version 并解析版本号，失败时返回 None"""
+    try:
+        output = subprocess.run([path, '--version'], capture_output=True,
+                                text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = _VERSION_RE.search(output)
+    return match.group(0) if match else None
+
+
+def major_version(version):
+    return version.split('.', 1)[0] if version else None
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class DriverResolver:
+    """探测并缓存浏览器和驱动的路径与版本"""
+
+    def __init__(self, cache_path=None, driver_dir='drivers'):
+        self.cache_path = cache_path
+        self.driver_dir = driver_dir
+        self._entries = {}
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except Exception as e:
+                print(f"⚠️ 驱动解析缓存读取失败，重新探测: {str(e)[:80]}")
+                self._entries = {}
+
+    def _cached(self, kind, path=None):
+        """返回仍然有效的缓存条目 (路径存在且 mtime 未变)"""
+        entry = self._entries.get(kind)
+        if not entry or (path and entry.get('path') != path):
+            return None
+        if _mtime(entry.get('path') or '') != entry.get('mtime'):
+            return None
+        return entry
+
+    def _remember(self, kind, path, version):
+        self._entries[kind] = {'path': path, 'mtime': _mtime(path), 'version': version}
+
+    def find_browser(self):
+        """按 CHROME_BIN、常见安装路径、PATH 的顺序查找浏览器"""
+        candidates = [os.environ.get('CHROME_BIN', '').strip()] + CHROME_PATHS
+        candidates += [shutil.which(name) for name in ('google-chrome', 'chromium', 'chromium-browser')]
+        for path in candidates:
+            if path and os.path.isfile(path):
+                return path
+        return None
+
+    def resolve_browser(self):
+        cached = self._cached('browser')
+        chrome_bin = os.environ.get('CHROME_BIN', '').strip()
+        if cached and (not os.path.isfile(chrome_bin) or cached['path'] == chrome_bin):
+            return cached['path'], cached['version'], True
+        path = self.find_browser()
+        if not path:
+            return None, None, False
+        version = probe_version(path)
+        self._remember('browser', path, version)
+        return path, version, False
+
+    def pinned_driver_path(self, browser_version):
+        return os.path.join(self.driver_dir, browser_version, 'chromedriver')
+
+    def driver_candidates(self, browser_version):
+        """按优先级列出可能的驱动: 指定路径、本地固定目录、PATH、下载缓存"""
+        override = os.environ.get('NETLIB_CHROMEDRIVER', '').strip()
+        if override:
+            yield override
+        if browser_version:
+            yield self.pinned_driver_path(browser_version)
+        which = shutil.which('chromedriver')
+        if which:
+            yield which
+        for pattern in DRIVER_CACHE_GLOBS:
+            # 版本目录名倒序，较新的驱动优先
+            yield from sorted(glob.glob(os.path.expanduser(pattern)), reverse=True)
+
+    def resolve_driver(self, browser_version):
+        """找到主版本与浏览器一致的驱动；浏览器版本未知时接受第一个可用驱动"""
+        override = os.environ.get('NETLIB_CHROMEDRIVER', '').strip() or None
+        cached = self._cached('driver', override)
+        if cached and major_version(cached['version']) == major_version(browser_version):
+            return cached['path'], cached['version'], True
+        for path in self.driver_candidates(browser_version):
+            if not os.path.isfile(path) or not os.access(path, os.X_OK):
+                continue
+            version = probe_version(path)
+            if browser_version and major_version(version) != major_version(browser_version):
+                continue
+            self._remember('driver', path, version)
+            return path, version, False
+        self._entries.pop('driver', None)
+        return None, None, False
+
+    def resolve(self):
+        """返回 (Resolution, 是否完全来自缓存)"""
+        browser, browser_version, browser_cached = self.resolve_browser()
+        driver, driver_version, driver_cached = self.resolve_driver(browser_version)
+        return (Resolution(browser, browser_version, driver, driver_version),
+                browser_cached and driver_cached)
+
+    def pin_driver(self, path, browser_version):
+        """把下载得到的驱动复制到本地固定目录，之后的冷启动直接使用，返回新路径"""
+        if not browser_version:
+            self._remember('driver', path, probe_version(path))
+            return path
+        target = self.pinned_driver_path(browser_version)
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f"{target}.tmp"
+            shutil.copy2(path, tmp_path)
+            os.chmod(tmp_path, os.stat(tmp_path).st_mode | stat.S_IXUSR)
+            os.replace(tmp_path, target)
+        except OSError as e:
+            print(f"⚠️ 驱动固定失败，继续使用下载位置: {str(e)[:80]}")
+            target = path
+        self._remember('driver', target, probe_version(target))
+        return target
+
+    def save(self):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.cache_path)
+
+
+def resolver_from_env():
+    """NETLIB_DRIVER_CACHE (默认 driver_cache.json)、NETLIB_DRIVER_DIR (默认 drivers)"""
+    cache_path = os.environ.get('NETLIB_DRIVER_CACHE', 'driver_cache.json').strip() or None
+    driver_dir = os.environ.get('NETLIB_DRIVER_DIR', 'drivers').strip() or 'drivers'
+    return DriverResolver(cache_path, driver_dir)
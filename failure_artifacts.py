@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+失败现场保存 - 登录失败时保存截图、页面源码和浏览器控制台日志
+
+登录线程只负责从浏览器取数据，压缩和写盘由后台线程完成，成功的账号没有任何额外开销。
+  NETLIB_ARTIFACTS         设为 0 禁用 (默认开启)
+  NETLIB_ARTIFACT_DIR      保存目录 (默认 artifacts)
+  NETLIB_ARTIFACT_MAX_MB   每次运行写入的总大小上限 (默认 50 MB)，超出后不再采集
+"""
+
+import gzip
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+MB = 1024 * 1024
+
+
+def safe_name(value):
+    """文件名中只保留字母、数字和少量符号"""
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', str(value))[:60] or 'unknown'
+
+
+class ArtifactWriter:
+    """后台写入线程和总大小上限"""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.written = 0
+        self.files = 0
+        self.captures = 0
+        self.dropped = 0
+        # 已排队但未写出的原始字节数，用于在采集前预判是否超出上限
+        self._pending = 0
+
+    def has_room(self):
+        with self._lock:
+            return self.written + self._pending < self.max_bytes
+
+    def skip(self):
+        """记录一次因超出上限而放弃的采集"""
+        with self._lock:
+            self.dropped += 1
+
+    def submit(self, prefix, items):
+        """排队写出一组文件: items 为 [(后缀, 字节, 是否压缩)]"""
+        size = sum(len(data) for _, data, _ in items)
+        with self._lock:
+            if self.written + self._pending + size > self.max_bytes:
+                self.dropped += 1
+                return False
+            self._pending += size
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='artifact-writer', daemon=True)
+                self._thread.start()
+        self._queue.put((prefix, items, size))
+        return True
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            prefix, items, size = task
+            written = 0
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                for suffix, data, compress in items:
+                    path = os.path.join(self.directory, prefix + suffix + ('.gz' if compress else ''))
+                    if compress:
+                        data = gzip.compress(data, compresslevel=6)
+                    with open(path, 'wb') as f:
+                        f.write(data)
+                    written += len(data)
+                    with self._lock:
+                        self.files += 1
+            except Exception as e:
+                print(f"⚠️ 失败现场写入失败: {str(e)[:80]}")
+            with self._lock:
+                self._pending -= size
+                self.written += written
+                self.captures += 1
+
+    def close(self):
+        """等待排队的写入全部完成"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+
+def capture(driver, writer, account_num, username, phase, reason):
+    """从浏览器取截图、源码和控制台日志交给后台线程写出，返回是否已排队
+
+    每一项单独容错: 浏览器已崩溃时也尽量保存能取到的部分。
+    """
+    if not writer.has_room():
+        # 已达上限时不再向浏览器取数据，失败账号也不多花时间
+        writer.skip()
+        return False
+    prefix = f"{time.strftime('%Y%m%d-%H%M%S')}_{account_num:04d}_{safe_name(username)}_{safe_name(phase)}"
+    items = []
+    meta = {'account': account_num, 'username': username, 'phase': phase, 'reason': reason}
+    try:
+        meta['url'] = driver.current_url
+    except Exception:
+        pass
+    try:
+        # PNG 已经是压缩格式，不再 gzip
+        items.append(('.png', driver.get_screenshot_as_png(), False))
+    except Exception as e:
+        meta['screenshot_error'] = str(e)[:200]
+    try:
+        items.append(('.html', driver.page_source.encode('utf-8'), True))
+    except Exception as e:
+        meta['page_source_error'] = str(e)[:200]
+    try:
+        lines = [f"{entry.get('timestamp')} {entry.get('level')} {entry.get('message')}"
+                 for entry in driver.get_log('browser')]
+        items.append(('.console.log', '\n'.join(lines).encode('utf-8'), True))
+    except Exception as e:
+        meta['console_error'] = str(e)[:200]
+    items.append(('.json', json.dumps(meta, ensure_ascii=False, indent=2).encode('utf-8'), False))
+    return writer.submit(prefix, items)
+
+
+def writer_from_env():
+    """NETLIB_ARTIFACTS=0 时返回 None"""
+    if os.environ.get('NETLIB_ARTIFACTS', '1').strip().lower() in ('0', 'false', 'no'):
+        return None
+    directory = os.environ.get('NETLIB_ARTIFACT_DIR', '').strip() or 'artifacts'
+    value = os.environ.get('NETLIB_ARTIFACT_MAX_MB', '').strip()
+    try:
+        max_mb = float(value) if value else 50.0
+    except ValueError:
+        print(f"⚠️ NETLIB_ARTIFACT_MAX_MB 无效: {value}，使用默认值 50")
+        max_mb = 50.0
+    return ArtifactWriter(directory, max_mb * MB)
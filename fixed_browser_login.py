@@ -4,39 +4,203 @@
 浏览器修复版登录脚本 - 解决Chrome安装问题
 """
 
+import argparse
 import os
 import time
 import sys
+import threading
 import traceback
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import (
-    NoSuchElementException,
     TimeoutException,
     WebDriverException
 )
 
+from account_log import (
+    account_output,
+    buffering_enabled,
+    debug,
+    install_account_log,
+    log_enabled,
+    uninstall_account_log,
+)
+from account_sources import iter_valid_accounts, open_account_source
+from cdp_driver import CdpBrowser, CdpPage
+from checkin_state import (
+    STATUS_DEFERRED,
+    STATUS_FAILED,
+    STATUS_FRESH,
+    STATUS_SUCCESS,
+    SUCCESS_STATUSES,
+    incremental_from_env,
+    state_from_env
+)
+from deadline import order_by_staleness, priority_mode, scheduler_from_env
+from driver_resolution import resolver_from_env
+from failure_artifacts import capture as capture_artifacts, writer_from_env
+from form_fill import fill_and_submit, fill_mode, type_like_human
+from http_login import HttpFallback, close_adapters, http_login
+from lean_loading import (
+    apply_resource_blocking,
+    format_page_stats,
+    lean_mode_enabled,
+    measure_page,
+    page_load_strategy
+)
+from login_metrics import (
+    annotate,
+    close_tracing,
+    configure_tracing_from_env,
+    phase,
+    record_phase,
+    set_account
+)
+from login_outcome import FAILURE, SUCCESS, detect_login_outcome, detect_session_valid
+from login_scheduler import limiter_from_env
+from memory_control import MB, controller_from_env
+from page_waits import (
+    NAVIGATION_MARKER,
+    human_delay,
+    mark_document,
+    step_timeout,
+    wait_for_navigation,
+    wait_for_network_idle,
+    wait_for_ready_state
+)
+from profile_template import template_from_env
+from retry_policy import PhaseFailed, breaker_from_env, policy_from_env
+from selector_cache import SelectorCache
+from session_store import store_from_env
+from sharding import (
+    default_results_path,
+    filter_shard,
+    load_results,
+    parse_shard,
+    write_results
+)
+
+# 站点地址，可通过 NETLIB_BASE_URL 指向本地替身服务器
+BASE_URL = os.environ.get('NETLIB_BASE_URL', 'https://www.netlib.re/').rstrip('/') + '/'
+
+# 复用浏览器模式: 每个工作线程持有一个常驻浏览器
+_warm = threading.local()
+_warm_drivers = []
+_reuse_lock = threading.Lock()
+_reuse_stats = {'launches': 0, 'launch_seconds': 0.0, 'resets': 0, 'reset_seconds': 0.0}
+
+# 全局共享对象延迟创建时使用的锁
+_init_lock = threading.Lock()
+
+# 所有工作线程共享的站点限速器
+_rate_limiter = None
+
+# 按阶段的重试策略和按站点的熔断器
+_retry_policy = None
+_circuit_breaker = None
+
+# 跨运行持久化的选择器缓存 (NETLIB_SELECTOR_CACHE 为空时禁用)
+_selector_cache = None
+
+# 加密的账号会话存储 (未设置 NETLIB_SESSION_KEY 时禁用)
+_session_store = None
+
+# 浏览器和驱动的解析结果，每个进程只探测一次
+_driver_resolver = None
+_resolution = None
+
+# 守护进程模式的常驻浏览器池 (单次运行时为 None)
+_browser_pool = None
+
+# 内存感知的并发控制 (未设置 NETLIB_MEMORY_BUDGET_MB 时禁用)
+_memory_controller = None
+
+# 浏览器配置模板 (未设置 NETLIB_PROFILE_TEMPLATE 时禁用)
+_profile_template = None
+
+# CDP 直连驱动共用的 Chrome 进程和它的配置目录 (NETLIB_BACKEND=cdp 时按需启动)
+_cdp_browser = None
+_cdp_profile = None
+_cdp_lock = threading.Lock()
+
+# 时间预算调度 (未设置 NETLIB_TIME_BUDGET 时禁用)
+_deadline = None
+
+# 失败现场的后台写入器 (NETLIB_ARTIFACTS=0 时禁用)
+_artifact_writer = None
+
+# 签到状态存储和增量模式的新鲜窗口 (秒)，在 main 中按分片设置
+_checkin_state = None
+_fresh_window = None
+
+# 本次运行的计数统计
+_run_stats = Counter()
+_stats_lock = threading.Lock()
+
+# 当前这一轮的进度: 已读取和已处理完的账号数
+_progress = {'read': 0, 'done': 0}
+
+def get_driver_resolution():
+    """解析浏览器和驱动的路径与版本，首次调用时探测 (或读取磁盘缓存)，之后直接返回"""
+    global _driver_resolver, _resolution
+    with _init_lock:
+        if _resolution is None:
+            _driver_resolver = resolver_from_env()
+            _resolution, cached = _driver_resolver.resolve()
+            source = "缓存" if cached else "探测"
+            if _resolution.browser:
+                print(f"✅ 找到Chrome二进制文件: {_resolution.browser} "
+                      f"(版本 {_resolution.browser_version or '未知'}, {source})")
+            else:
+                print("❌ 未找到Chrome二进制文件")
+            if _resolution.driver:
+                print(f"✅ 使用本地ChromeDriver: {_resolution.driver} "
+                      f"(版本 {_resolution.driver_version or '未知'}, {source})")
+            save_driver_resolution()
+        return _resolution
+
+def save_driver_resolution():
+    try:
+        _driver_resolver.save()
+    except Exception as e:
+        print(f"⚠️ 驱动解析缓存保存失败: {str(e)[:80]}")
+
 def find_chrome_binary():
-    """查找Chrome二进制文件的可能位置"""
-    possible_paths = [
-        '/usr/bin/google-chrome',
-        '/usr/bin/chromium',
-        '/usr/bin/chromium-browser',
-        '/opt/google/chrome/chrome',
-        '/usr/local/bin/google-chrome',
-        '/snap/bin/chromium'
-    ]
-    
-    for path in possible_paths:
-        if os.path.exists(path) and os.path.isfile(path):
-            print(f"✅ 找到Chrome二进制文件: {path}")
-            return path
+    """查找Chrome二进制文件的位置 (结果在进程内和磁盘上缓存)"""
+    return get_driver_resolution().browser
+
+def install_driver():
+    """通过 webdriver-manager 下载驱动 (需要联网)，并固定到本地目录供之后的冷启动使用
+
+    在已固定的驱动启动失败后调用，新下载的驱动总是替换已固定的驱动。
+    """
+    from webdriver_manager.chrome import ChromeDriverManager
     
-    print("❌ 未找到Chrome二进制文件")
-    return None
+    return pin_driver(ChromeDriverManager().install(), force=True)
+
+def pin_driver(path, force=False):
+    """把下载或 Selenium Manager 找到的驱动固定到本地目录，之后的冷启动不再联网查找
+
+    force 为 False 时，如果其他线程已经固定过驱动则沿用它；为 True 时替换已固定的驱动。
+    """
+    global _resolution
+    resolution = get_driver_resolution()
+    with _init_lock:
+        if _resolution.driver and not force:
+            # 其他线程已经固定过
+            return _resolution.driver
+        path = _driver_resolver.pin_driver(path, resolution.browser_version)
+        _resolution = resolution._replace(driver=path)
+        save_driver_resolution()
+    print(f"📌 ChromeDriver 已固定到: {path}")
+    return path
 
 def setup_chrome_options():
     """设置Chrome选项"""
@@ -57,297 +221,1362 @@ def setup_chrome_options():
     chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
     chrome_options.add_experimental_option('useAutomationExtension', False)
     
+    # 转发 CDP 网络事件，用于判断网络空闲；保留控制台日志，用于失败现场
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL', 'browser': 'ALL'})
+    
+    # 精简模式默认 eager: DOM 就绪即返回，不等图片等子资源
+    chrome_options.page_load_strategy = page_load_strategy()
+    
     return chrome_options
 
+def hide_automation(driver):
+    """在当前标签页注入隐藏 navigator.webdriver 的脚本"""
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+        'source': '''
+            Object.defineProperty(navigator, 'webdriver', {
+                get: () => undefined
+            })
+        '''
+    })
+
+def count_round_trips(driver):
+    """统计该驱动发出的 WebDriver 命令数 (每条命令一次 HTTP 往返)"""
+    execute = driver.execute
+    
+    def counted(driver_command, params=None):
+        count_stat('webdriver_commands')
+        return execute(driver_command, params)
+    
+    driver.execute = counted
+
+def register_browser(driver):
+    """把驱动进程登记到内存控制器，浏览器进程是它的子进程"""
+    if _memory_controller is None:
+        return
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    _memory_controller.register(getattr(process, 'pid', None))
+
+def get_profile_template():
+    """获取浏览器配置模板，首次调用时根据环境变量创建"""
+    global _profile_template
+    with _init_lock:
+        if _profile_template is None:
+            _profile_template = template_from_env() or False
+        return _profile_template or None
+
+def build_profile_template(path, resolution):
+    """用一次真实的浏览器启动初始化模板配置目录"""
+    options = setup_chrome_options()
+    options.add_argument(f'--user-data-dir={path}')
+    if resolution.browser:
+        options.binary_location = resolution.browser
+    service = Service(resolution.driver) if resolution.driver else Service()
+    driver = webdriver.Chrome(service=service, options=options)
+    try:
+        driver.get('about:blank')
+    finally:
+        driver.quit()
+
+def clone_profile(resolution):
+    """从模板克隆一个配置目录，模板不可用时返回 None (使用 Chrome 默认的临时配置)"""
+    template = get_profile_template()
+    if template is None:
+        return None
+    with phase('profile_template'):
+        ready = template.ensure(lambda path: build_profile_template(path, resolution),
+                                resolution.browser_version)
+    if not ready:
+        return None
+    with phase('profile_clone'):
+        return template.clone()
+
+def attach_profile(driver, profile):
+    """浏览器退出时把克隆的配置目录交给后台删除"""
+    quit = driver.quit
+    
+    def quit_and_discard():
+        try:
+            quit()
+        finally:
+            _profile_template.discard(profile)
+    
+    driver.quit = quit_and_discard
+
+def get_artifact_writer():
+    """获取失败现场的写入器，首次调用时根据环境变量创建"""
+    global _artifact_writer
+    with _init_lock:
+        if _artifact_writer is None:
+            _artifact_writer = writer_from_env() or False
+        return _artifact_writer or None
+
+def save_failure_artifacts(driver, username, account_num, phase_name, reason):
+    """在失败的阶段保存截图、页面源码和控制台日志，写盘在后台完成"""
+    writer = get_artifact_writer()
+    if writer is None:
+        return
+    try:
+        with phase('failure_artifacts'):
+            queued = capture_artifacts(driver, writer, account_num, username, phase_name, reason)
+        if queued:
+            print(f"📎 已保存阶段 {phase_name} 的失败现场")
+    except Exception as e:
+        print(f"⚠️ 失败现场采集异常: {str(e)[:80]}")
+
+def close_artifact_writer():
+    """等待失败现场写完并打印汇总；下一轮 (守护进程) 重新创建写入器，大小上限按轮计算"""
+    global _artifact_writer
+    with _init_lock:
+        writer = _artifact_writer or None
+        _artifact_writer = None
+    if writer is None:
+        return
+    writer.close()
+    if writer.captures or writer.dropped:
+        line = (f"📎 失败现场: {writer.captures} 份 ({writer.files} 个文件, "
+                f"{writer.written / 1024:.0f} KB) 已写入 {writer.directory}/")
+        if writer.dropped:
+            line += f"，超出大小上限未保存 {writer.dropped} 份"
+        print(line)
+
+def close_profile_template():
+    """等待后台删除完所有配置克隆"""
+    template = _profile_template or None
+    if template is None:
+        return
+    template.close()
+    if template.clones:
+        print(f"🧹 浏览器配置克隆: 创建 {template.clones} 个，已删除 {template.removed} 个")
+
+def launch_cdp_browser():
+    """启动 CDP 直连驱动共用的 Chrome，无法启动时返回 None"""
+    global _cdp_profile
+    resolution = get_driver_resolution()
+    if not resolution.browser:
+        print("⚠️ 未找到Chrome二进制文件，CDP 直连不可用")
+        return None
+    profile = clone_profile(resolution)
+    try:
+        with phase('chrome_launch', driver='cdp'):
+            browser = CdpBrowser(resolution.browser, setup_chrome_options().arguments, profile)
+    except ImportError:
+        print("⚠️ 未安装 websockets，CDP 直连不可用")
+    except Exception as e:
+        print(f"⚠️ CDP 直连启动 Chrome 失败: {str(e)[:80]}")
+    else:
+        _cdp_profile = profile
+        if _memory_controller is not None:
+            # 所有标签页共用这一个 Chrome，内存按它的进程树统计
+            _memory_controller.register(browser.pid)
+        print(f"✅ CDP 直连已连接: {browser.version.get('product', '')}")
+        return browser
+    if profile:
+        _profile_template.discard(profile)
+    return None
+
+def get_cdp_browser():
+    """获取共用的 Chrome，首次调用时启动，进程退出后重新启动；启动失败后本次运行改用 Selenium"""
+    global _cdp_browser
+    with _cdp_lock:
+        if _cdp_browser and not _cdp_browser.alive():
+            print("⚠️ CDP 直连的 Chrome 已退出，重新启动")
+            _close_cdp_browser()
+            _cdp_browser = None
+        if _cdp_browser is None:
+            _cdp_browser = launch_cdp_browser() or False
+            if not _cdp_browser:
+                print("🔄 改用 Selenium 驱动")
+        return _cdp_browser or None
+
+def create_cdp_driver():
+    """在共用的 Chrome 中为账号打开独立的浏览器上下文和标签页，返回与 WebDriver 接口一致的 CdpPage"""
+    browser = get_cdp_browser()
+    if browser is None:
+        return None
+    try:
+        with phase('cdp_page'):
+            driver = browser.new_page()
+            driver.page_load_strategy = page_load_strategy()
+            driver.set_page_load_timeout(step_timeout('navigate'))
+            count_round_trips(driver)
+            hide_automation(driver)
+            if lean_mode_enabled():
+                apply_resource_blocking(driver)
+        return driver
+    except Exception as e:
+        print(f"❌ CDP 直连打开标签页失败: {str(e)[:80]}")
+        return None
+
+def _close_cdp_browser():
+    global _cdp_profile
+    try:
+        _cdp_browser.close()
+    except Exception:
+        pass
+    if _cdp_profile:
+        _profile_template.discard(_cdp_profile)
+        _cdp_profile = None
+
+def close_cdp_browser():
+    """关闭 CDP 直连共用的 Chrome"""
+    global _cdp_browser
+    with _cdp_lock:
+        if _cdp_browser:
+            _close_cdp_browser()
+            print(f"🔒 已关闭 CDP 直连的 Chrome (共打开 {_cdp_browser.pages} 个标签页)")
+        _cdp_browser = None
+
 def create_driver():
-    """创建WebDriver实例，支持多种浏览器路径"""
+    """创建WebDriver实例，支持多种浏览器路径；CDP 后端返回直连的标签页，不可用时回退到 Selenium"""
+    if get_backend() == 'cdp':
+        driver = create_cdp_driver()
+        if driver is not None:
+            return driver
+    profile = None
+    driver = None
     try:
-        chrome_options = setup_chrome_options()
+        with phase('chrome_options'):
+            chrome_options = setup_chrome_options()
+        
+        # 浏览器和驱动路径每个进程只解析一次
+        with phase('find_chrome') as span:
+            resolution = get_driver_resolution()
+            span['binary'] = resolution.browser
+            span['driver'] = resolution.driver
+        if resolution.browser:
+            chrome_options.binary_location = resolution.browser
         
-        # 尝试自动查找Chrome二进制文件
-        chrome_binary = find_chrome_binary()
-        if chrome_binary:
-            chrome_options.binary_location = chrome_binary
+        # 从预先初始化的模板克隆配置目录，Chrome 启动时不必重新创建
+        profile = clone_profile(resolution)
+        if profile:
+            chrome_options.add_argument(f'--user-data-dir={profile}')
         
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.implicitly_wait(15)
+        with phase('chrome_launch'):
+            # 没有本地驱动时交给 Selenium Manager 查找
+            service = Service(resolution.driver) if resolution.driver else Service()
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+            if profile:
+                attach_profile(driver, profile)
+            count_round_trips(driver)
+            register_browser(driver)
+            driver.set_page_load_timeout(step_timeout('navigate'))
+        if not resolution.driver and driver.service.path:
+            # Selenium Manager 找到的驱动固定下来，之后不必每次启动都运行 (可能联网)
+            pin_driver(driver.service.path)
         
         # 进一步隐藏自动化特征
-        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-            'source': '''
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                })
-            '''
-        })
+        with phase('hide_automation'):
+            hide_automation(driver)
+        
+        if lean_mode_enabled():
+            with phase('resource_blocking'):
+                apply_resource_blocking(driver)
         
         print("✅ 浏览器驱动初始化成功")
         return driver
     except WebDriverException as e:
         print(f"❌ 浏览器驱动初始化失败: {str(e)}")
         
+        # 浏览器已启动但之后的设置失败: 先关闭，否则它一直锁定克隆的配置目录，备用方法的 Chrome 无法启动
+        discard_failed_driver(driver, profile)
+        driver = None
+        if profile:
+            # 原配置目录已交给后台删除，备用方法使用新的克隆
+            chrome_options.arguments.remove(f'--user-data-dir={profile}')
+            profile = clone_profile(resolution)
+            if profile:
+                chrome_options.add_argument(f'--user-data-dir={profile}')
+        
         # 尝试使用ChromeDriver的备用方法
         try:
-            from selenium.webdriver.chrome.service import Service
-            from webdriver_manager.chrome import ChromeDriverManager
-            
             print("🔄 尝试使用webdriver-manager自动管理ChromeDriver")
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            driver.implicitly_wait(15)
+            with phase('driver_install'):
+                service = Service(install_driver())
+            with phase('chrome_launch'):
+                driver = webdriver.Chrome(service=service, options=chrome_options)
+                if profile:
+                    attach_profile(driver, profile)
+                count_round_trips(driver)
+                register_browser(driver)
+                driver.set_page_load_timeout(step_timeout('navigate'))
+            apply_resource_blocking(driver)
             print("✅ 使用webdriver-manager成功初始化浏览器")
             return driver
         except Exception as e2:
             print(f"❌ webdriver-manager也失败: {str(e2)}")
             traceback.print_exc()
+            discard_failed_driver(driver, profile)
             return None
     except Exception as e:
         print(f"❌ 创建浏览器失败: {str(e)}")
         traceback.print_exc()
+        discard_failed_driver(driver, profile)
         return None
 
-def safe_find_element(driver, selectors, description):
-    """安全查找元素，尝试多个选择器"""
-    for i, (by, value) in enumerate(selectors, 1):
+def discard_failed_driver(driver, profile):
+    """关闭初始化失败的浏览器并删除它的配置目录 (浏览器未启动时只删除目录)"""
+    if driver is not None:
         try:
-            element = driver.find_element(by, value)
-            print(f"✅ [{i}/{len(selectors)}] 找到{description}: {by}={value}")
-            return element
-        except NoSuchElementException:
-            print(f"❌ [{i}/{len(selectors)}] 选择器失败: {by}={value}")
-            continue
-        except Exception as e:
-            print(f"⚠️ [{i}/{len(selectors)}] 选择器异常: {by}={value}, 错误: {str(e)[:50]}...")
-            continue
+            # 启动后立即 attach_profile，quit 会把配置目录交给后台删除
+            driver.quit()
+        except Exception:
+            pass
+    elif profile:
+        _profile_template.discard(profile)
+
+# 在浏览器端一次性按优先级评估全部选择器，返回 [命中序号, 元素, 每个选择器的匹配数/错误]
+RESOLVE_SELECTORS_JS = """
+const selectors = arguments[0];
+const visibleOnly = arguments[1];
+const isVisible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+const linkText = (el) => (el.innerText || el.textContent || '').trim();
+const query = (by, value) => {
+    switch (by) {
+        case 'xpath': {
+            const snapshot = document.evaluate(value, document, null,
+                XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            const nodes = [];
+            for (let i = 0; i < snapshot.snapshotLength; i++) nodes.push(snapshot.snapshotItem(i));
+            return nodes;
+        }
+        case 'css selector': return Array.from(document.querySelectorAll(value));
+        case 'id': return Array.from(document.querySelectorAll('[id="' + CSS.escape(value) + '"]'));
+        case 'name': return Array.from(document.getElementsByName(value));
+        case 'tag name': return Array.from(document.getElementsByTagName(value));
+        case 'class name': return Array.from(document.getElementsByClassName(value));
+        case 'link text':
+            return Array.from(document.querySelectorAll('a')).filter(a => linkText(a) === value);
+        case 'partial link text':
+            return Array.from(document.querySelectorAll('a')).filter(a => linkText(a).includes(value));
+        default: throw new Error('unsupported locator: ' + by);
+    }
+};
+const report = [];
+let found = -1;
+let element = null;
+for (let i = 0; i < selectors.length; i++) {
+    try {
+        let nodes = query(selectors[i][0], selectors[i][1]);
+        if (visibleOnly) nodes = nodes.filter(isVisible);
+        report.push(nodes.length);
+        if (found < 0 && nodes.length) {
+            found = i;
+            element = nodes[0];
+        }
+    } catch (e) {
+        report.push(String(e && e.message || e));
+    }
+}
+return [found, element, report];
+"""
+
+def resolve_selectors(driver, selectors, timeout=10, poll_interval=0.25, visible_only=False):
+    """在一次脚本调用中评估全部选择器，轮询直到任一选择器命中或超时
+
+    返回 (命中序号, 元素, 诊断列表)，未命中时序号为 -1、元素为 None。
+    诊断列表中每项为该选择器的匹配数量，或评估出错时的错误信息。
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        index, element, report = driver.execute_script(
+            RESOLVE_SELECTORS_JS, [list(selector) for selector in selectors], visible_only
+        )
+        if index >= 0 or time.monotonic() >= deadline:
+            return index, element, report
+        time.sleep(poll_interval)
+
+def get_selector_cache():
+    """获取选择器缓存，首次调用时从磁盘加载"""
+    global _selector_cache
+    with _init_lock:
+        if _selector_cache is None:
+            path = os.environ.get('NETLIB_SELECTOR_CACHE', 'selector_cache.json').strip()
+            _selector_cache = SelectorCache(path) if path else False
+        return _selector_cache or None
+
+def selector_cache_key(page, field):
+    """生成 站点|页面|字段 形式的缓存键"""
+    return SelectorCache.make_key(urlparse(BASE_URL).netloc, page, field)
+
+def save_selector_cache():
+    """保存选择器缓存并打印命中统计"""
+    cache = get_selector_cache()
+    if not cache:
+        return
+    try:
+        cache.save()
+    except Exception as e:
+        print(f"⚠️ 选择器缓存保存失败: {str(e)[:80]}")
+    print(f"\n选择器缓存统计: {cache.summary()}")
+
+def safe_find_element(driver, selectors, description, timeout=None, cache_key=None):
+    """安全查找元素，按优先级尝试多个选择器
+
+    指定 cache_key 时优先尝试上次命中的选择器，并记录本次结果。
+    """
+    with phase('find_element', field=description):
+        return _safe_find_element(driver, selectors, description, timeout, cache_key)
+
+def _safe_find_element(driver, selectors, description, timeout, cache_key):
+    if timeout is None:
+        timeout = step_timeout('element')
+    cache = get_selector_cache() if cache_key else None
+    cached = None
+    if cache:
+        selectors, cached = cache.prioritize(cache_key, selectors)
     
-    print(f"❌ 所有选择器都无法找到{description}")
-    return None
+    try:
+        index, element, report = resolve_selectors(driver, selectors, timeout=timeout)
+    except Exception as e:
+        print(f"⚠️ 选择器解析异常: {str(e)[:80]}...")
+        return None
+    
+    if cache:
+        cache.record(cache_key, cached, tuple(selectors[index]) if index >= 0 else None)
+    
+    # 调试级别输出与逐个尝试时相同的诊断信息: 命中之前的选择器均视为失败
+    if log_enabled('debug'):
+        last = index if index >= 0 else len(selectors) - 1
+        for i, ((by, value), outcome) in enumerate(zip(selectors[:last + 1], report), 1):
+            if i - 1 == index:
+                debug(f"✅ [{i}/{len(selectors)}] 找到{description}: {by}={value}")
+            elif isinstance(outcome, str):
+                debug(f"⚠️ [{i}/{len(selectors)}] 选择器异常: {by}={value}, 错误: {outcome[:50]}...")
+            else:
+                debug(f"❌ [{i}/{len(selectors)}] 选择器失败: {by}={value}")
+    
+    if index < 0:
+        print(f"❌ 所有选择器都无法找到{description}")
+        annotate(selector=None, outcome='not_found')
+        return None
+    by, value = selectors[index]
+    annotate(selector=f"{by}={value}", cache_hit=cached is not None and index == 0)
+    return element
+
+def count_stat(name, amount=1):
+    """线程安全地累加运行统计"""
+    with _stats_lock:
+        _run_stats[name] += amount
+
+def reset_run_stats():
+    """清空运行统计和进度 (守护进程每一轮开始时调用)"""
+    with _stats_lock:
+        _run_stats.clear()
+        _progress.update(read=0, done=0)
+
+def note_progress(read=0, done=0):
+    with _stats_lock:
+        _progress['read'] += read
+        _progress['done'] += done
+
+def get_progress():
+    """返回 (已读取账号数, 已处理完账号数)"""
+    with _stats_lock:
+        return _progress['read'], _progress['done']
+
+def get_session_store():
+    """获取会话存储，首次调用时根据环境变量创建"""
+    global _session_store
+    with _init_lock:
+        if _session_store is None:
+            _session_store = store_from_env() or False
+        return _session_store or None
+
+def try_session_login(driver, username):
+    """用保存的 Cookie 恢复会话，一次页面加载确认登录按钮不存在即视为已登录"""
+    store = get_session_store()
+    if not store:
+        return False
+    site = urlparse(BASE_URL).netloc
+    cookies = store.load(site, username)
+    if not cookies:
+        return False
+    
+    print("🍪 尝试使用保存的会话...")
+    try:
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+        driver.get(BASE_URL)
+        valid = detect_session_valid(driver, timeout=step_timeout('element'))
+    except Exception as e:
+        print(f"⚠️ 会话恢复异常: {str(e)[:80]}")
+        valid = False
+    
+    if valid:
+        print("✅ 会话仍然有效，跳过表单登录")
+        count_stat('session_fast_path')
+        return True
+    
+    print("🔄 会话已失效，改用表单登录")
+    store.delete(site, username)
+    try:
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    except Exception:
+        pass
+    return False
+
+def remember_session(driver, username):
+    """登录成功后加密保存当前站点的 Cookie"""
+    store = get_session_store()
+    if not store:
+        return
+    try:
+        cookies = driver.execute_cdp_cmd('Network.getCookies', {'urls': [BASE_URL]})['cookies']
+        if cookies:
+            store.save(urlparse(BASE_URL).netloc, username, cookies)
+            print(f"🍪 已保存会话 Cookie ({len(cookies)} 个)")
+    except Exception as e:
+        print(f"⚠️ 会话保存失败: {str(e)[:80]}")
+
+def report_page_load(driver, page):
+    """记录并打印当前页面的传输字节数和加载耗时"""
+    stats = measure_page(driver)
+    if not stats:
+        return
+    seconds = (stats.get('load_ms') or stats.get('dom_ms') or 0) / 1000
+    record_phase('page_load', seconds, page=page, bytes=stats['bytes'],
+                 resources=stats['resources'], lean=lean_mode_enabled())
+    print(f"📊 页面 {page}: {format_page_stats(stats)}")
+
+def _phase_navigate(ctx):
+    """访问网站首页"""
+    driver = ctx['driver']
+    print("📥 正在访问网站...")
+    driver.get(BASE_URL)
+    wait_for_ready_state(driver, state='interactive')
+    print("✅ 网站访问成功")
+    report_page_load(driver, 'home')
+
+def _phase_login_page(ctx):
+    """点击登录按钮进入登录页面，找不到按钮时直接访问登录页面"""
+    driver = ctx['driver']
+    debug("🔍 正在查找登录按钮...")
+    login_selectors = [
+        (By.LINK_TEXT, 'Login'),
+        (By.XPATH, '//a[contains(text(), "Login")]'),
+        (By.XPATH, '//a[@href="/login"]'),
+        (By.CSS_SELECTOR, 'a[href*="login"]')
+    ]
+    
+    login_btn = safe_find_element(driver, login_selectors, "登录按钮",
+        cache_key=selector_cache_key('home', 'login'))
+    if not login_btn:
+        print("❌ 无法找到登录按钮，尝试直接访问登录页面")
+        driver.get(BASE_URL + 'login')
+    else:
+        human_delay()
+        login_btn.click()
+        print("✅ 登录按钮点击成功")
+    # 点击后等待新页面就绪，用户名输入框本身的出现由下一阶段的查找等待
+    wait_for_ready_state(driver, state='interactive')
+    report_page_load(driver, 'login')
+
+def _phase_fill(ctx):
+    """定位用户名和密码输入框；逐键模式下直接输入，批量模式留到提交时一次填写"""
+    driver = ctx['driver']
+    mode = fill_mode(urlparse(BASE_URL).netloc)
+    annotate(fill_mode=mode)
+    ctx['fields'] = None
+    debug("🔍 正在查找用户名输入框...")
+    username_selectors = [
+        (By.XPATH, '//input[@placeholder="Username"]'),
+        (By.XPATH, '//input[@name="username"]'),
+        (By.XPATH, '//input[type="text"]'),
+        (By.XPATH, '//form//input[1]'),
+        (By.XPATH, '//label[text()="Username"]/following-sibling::input')
+    ]
+    
+    username_field = safe_find_element(driver, username_selectors, "用户名输入框",
+        cache_key=selector_cache_key('login', 'username'))
+    if not username_field:
+        raise PhaseFailed("无法找到用户名输入框")
+    
+    if mode == 'keys':
+        type_like_human(username_field, ctx['username'])
+        print(f"✅ 用户名输入成功: {ctx['username']}")
+        human_delay()
+    
+    # 输入密码
+    debug("🔍 正在查找密码输入框...")
+    password_selectors = [
+        (By.XPATH, '//input[@placeholder="Password"]'),
+        (By.XPATH, '//input[@name="password"]'),
+        (By.XPATH, '//input[type="password"]'),
+        (By.XPATH, '//form//input[2]'),
+        (By.XPATH, '//label[text()="Password"]/following-sibling::input'),
+        (By.XPATH, '//div[contains(text(), "Password")]/following-sibling::input')
+    ]
+    
+    password_field = safe_find_element(driver, password_selectors, "密码输入框",
+        cache_key=selector_cache_key('login', 'password'))
+    if not password_field:
+        raise PhaseFailed("无法找到密码输入框")
+    
+    if mode == 'keys':
+        type_like_human(password_field, ctx['password'])
+        print("✅ 密码输入成功")
+        human_delay()
+    else:
+        ctx['fields'] = [(username_field, ctx['username']), (password_field, ctx['password'])]
+
+def _phase_submit(ctx):
+    """提交表单并等待页面跳转完成；批量模式在同一次脚本调用中填写并提交"""
+    driver = ctx['driver']
+    debug("🔍 正在查找提交按钮...")
+    submit_selectors = [
+        (By.XPATH, '//button[text()="Validate"]'),
+        (By.XPATH, '//button[@type="submit"]'),
+        (By.XPATH, '//input[@type="submit"]'),
+        (By.XPATH, '//button[contains(text(), "Submit")]'),
+        (By.XPATH, '//form//button')
+    ]
+    
+    submit_btn = safe_find_element(driver, submit_selectors, "提交按钮",
+        cache_key=selector_cache_key('login', 'submit'))
+    if not submit_btn:
+        raise PhaseFailed("无法找到提交按钮")
+    
+    fields = ctx.get('fields')
+    submitted = False
+    if fields:
+        submitted, url_before, mismatched = fill_and_submit(driver, fields, submit_btn, NAVIGATION_MARKER)
+        if submitted:
+            print(f"✅ 批量填写并提交成功: {ctx['username']}")
+        else:
+            # 页面改写了字段值 (例如输入掩码)，改用逐键输入
+            print(f"⚠️ 批量填写后 {len(mismatched)} 个字段的值被页面改写，改用逐键输入")
+            for element, value in fields:
+                type_like_human(element, value)
+    if not submitted:
+        url_before = mark_document(driver)
+        submit_btn.click()
+        print("✅ 登录提交成功")
+    
+    # 等待跳转完成、页面加载和网络空闲，每一步都有超时上限；
+    # 精简模式只等 DOM 就绪，登录结果由下一阶段轮询页面元素确定
+    # 提交前的 URL 作为成功判定的基准 (离开登录页面)
+    ctx['baseline'] = {'url': url_before}
+    lean = lean_mode_enabled()
+    if wait_for_navigation(driver, url_before):
+        wait_for_ready_state(driver, state='interactive' if lean else 'complete')
+    if not lean:
+        wait_for_network_idle(driver)
+    report_page_load(driver, 'after_submit')
+
+def _phase_outcome(ctx):
+    """检查登录状态: 一次求值同时检查 URL、Cookie、登录链接和错误信息"""
+    debug("🔍 正在检查登录状态...")
+    outcome = detect_login_outcome(ctx['driver'], timeout=step_timeout('element'),
+                                   baseline=ctx.get('baseline'))
+    annotate(outcome=outcome.status)
+    if outcome.status == FAILURE:
+        # 站点明确拒绝，重试没有意义
+        raise PhaseFailed(f"登录失败 - {outcome.message}", retryable=False)
+    if outcome.status != SUCCESS:
+        raise PhaseFailed(f"无法确定登录状态 - {outcome.message}")
+    ctx['outcome'] = outcome
+
+# 登录流程的各个阶段，失败时只重试失败的阶段
+LOGIN_PHASES = [
+    ('navigate', _phase_navigate),
+    ('login_page', _phase_login_page),
+    ('fill', _phase_fill),
+    ('submit', _phase_submit),
+    ('outcome', _phase_outcome),
+]
+
+# 同一阶段再次失败时，从其前置阶段重新开始 (例如登录页面没有正确加载)
+RETRY_FROM = {
+    'fill': 'login_page',
+    'submit': 'login_page',
+}
 
 def login_account(driver, username, password, account_num):
-    """登录单个账号"""
+    """登录单个账号，按阶段执行并在可重试的失败上退避重试"""
     print(f"\n{'=' * 60}")
     print(f"账号 {account_num}: {username}")
     print(f"{'=' * 60}")
     
+    host = urlparse(BASE_URL).netloc
+    breaker = get_circuit_breaker()
+    policy = get_retry_policy()
+    
     try:
-        # 访问网站
-        print("📥 正在访问网站...")
-        driver.get('https://www.netlib.re/')
-        time.sleep(3)
-        print("✅ 网站访问成功")
-        
-        # 点击登录按钮
-        print("🔍 正在查找登录按钮...")
-        login_selectors = [
-            (By.LINK_TEXT, 'Login'),
-            (By.XPATH, '//a[contains(text(), "Login")]'),
-            (By.XPATH, '//a[@href="/login"]'),
-            (By.CSS_SELECTOR, 'a[href*="login"]')
-        ]
-        
-        login_btn = safe_find_element(driver, login_selectors, "登录按钮")
-        if not login_btn:
-            print("❌ 无法找到登录按钮，尝试直接访问登录页面")
-            driver.get('https://www.netlib.re/login')
-            time.sleep(3)
-        else:
-            login_btn.click()
-            print("✅ 登录按钮点击成功")
-            time.sleep(3)
-        
-        # 输入用户名
-        print("🔍 正在查找用户名输入框...")
-        username_selectors = [
-            (By.XPATH, '//input[@placeholder="Username"]'),
-            (By.XPATH, '//input[@name="username"]'),
-            (By.XPATH, '//input[type="text"]'),
-            (By.XPATH, '//form//input[1]'),
-            (By.XPATH, '//label[text()="Username"]/following-sibling::input')
-        ]
+        # 会话仍然有效时直接返回
+        with phase('session_restore'):
+            restored = try_session_login(driver, username)
+        if restored:
+            breaker.record_success(host)
+            return True
+    except Exception as e:
+        print(f"⚠️ 会话恢复异常: {str(e)[:80]}")
+    
+    ctx = {'driver': driver, 'username': username, 'password': password}
+    names = [name for name, _ in LOGIN_PHASES]
+    failures = Counter()
+    index = 0
+    while index < len(LOGIN_PHASES):
+        name, run_phase = LOGIN_PHASES[index]
+        try:
+            with phase(name):
+                run_phase(ctx)
+            index += 1
+            continue
+        except PhaseFailed as e:
+            print(f"❌ {e}")
+            reason = str(e)
+            if not e.retryable:
+                breaker.record_success(host)
+                save_failure_artifacts(driver, username, account_num, name, reason)
+                return False
+        except TimeoutException:
+            print("❌ 操作超时 - 页面可能加载缓慢")
+            traceback.print_exc()
+            reason = "操作超时"
+        except Exception as e:
+            print(f"❌ 登录过程异常: {str(e)}")
+            traceback.print_exc()
+            reason = f"登录过程异常: {str(e)[:200]}"
         
-        username_field = safe_find_element(driver, username_selectors, "用户名输入框")
-        if not username_field:
+        failures[name] += 1
+        if failures[name] >= policy.attempts:
+            print(f"❌ 阶段 {name} 失败 {failures[name]} 次，放弃该账号")
+            breaker.record_failure(host)
+            save_failure_artifacts(driver, username, account_num, name, reason)
             return False
-            
-        username_field.clear()
-        username_field.send_keys(username)
-        print(f"✅ 用户名输入成功: {username}")
-        time.sleep(2)
-        
-        # 输入密码
-        print("🔍 正在查找密码输入框...")
-        password_selectors = [
-            (By.XPATH, '//input[@placeholder="Password"]'),
-            (By.XPATH, '//input[@name="password"]'),
-            (By.XPATH, '//input[type="password"]'),
-            (By.XPATH, '//form//input[2]'),
-            (By.XPATH, '//label[text()="Password"]/following-sibling::input'),
-            (By.XPATH, '//div[contains(text(), "Password")]/following-sibling::input')
-        ]
-        
-        password_field = safe_find_element(driver, password_selectors, "密码输入框")
-        if not password_field:
+        if breaker.is_open(host):
+            print("⛔ 站点已熔断，不再重试")
+            # 半开状态下的探测账号也在这里结束，需要记下失败才会重新开始冷却
+            breaker.record_failure(host)
+            save_failure_artifacts(driver, username, account_num, name, reason)
             return False
-            
-        password_field.clear()
-        password_field.send_keys(password)
-        print("✅ 密码输入成功")
-        time.sleep(2)
         
-        # 提交登录
-        print("🔍 正在查找提交按钮...")
-        submit_selectors = [
-            (By.XPATH, '//button[text()="Validate"]'),
-            (By.XPATH, '//button[@type="submit"]'),
-            (By.XPATH, '//input[@type="submit"]'),
-            (By.XPATH, '//button[contains(text(), "Submit")]'),
-            (By.XPATH, '//form//button')
-        ]
-        
-        submit_btn = safe_find_element(driver, submit_selectors, "提交按钮")
-        if not submit_btn:
+        if failures[name] > 1:
+            index = names.index(RETRY_FROM.get(name, name))
+        delay = policy.delay(failures[name])
+        if out_of_time(delay):
+            save_failure_artifacts(driver, username, account_num, name, reason)
             return False
-            
-        submit_btn.click()
-        print("✅ 登录提交成功")
-        time.sleep(5)
-        
-        # 检查登录状态
-        print("🔍 正在检查登录状态...")
+        count_stat('phase_retries')
+        print(f"🔁 {delay:.1f} 秒后重试阶段 {names[index]} (第 {failures[name]} 次重试)")
+        time.sleep(delay)
+    
+    print(f"✅ 登录成功 - {ctx['outcome'].message}")
+    breaker.record_success(host)
+    remember_session(driver, username)
+    return True
+
+def get_worker_count():
+    """读取并发登录数量 (NETLIB_WORKERS)，默认串行"""
+    value = os.environ.get('NETLIB_WORKERS', '1').strip()
+    try:
+        workers = int(value)
+    except ValueError:
+        print(f"⚠️ NETLIB_WORKERS 无效: {value}，使用串行模式")
+        return 1
+    return max(1, workers)
+
+def get_rate_limiter():
+    """获取全局限速器，首次调用时根据环境变量创建"""
+    global _rate_limiter
+    with _init_lock:
+        if _rate_limiter is None:
+            _rate_limiter = limiter_from_env()
+        return _rate_limiter
+
+def get_retry_policy():
+    """获取全局重试策略，首次调用时根据环境变量创建"""
+    global _retry_policy
+    with _init_lock:
+        if _retry_policy is None:
+            _retry_policy = policy_from_env()
+        return _retry_policy
+
+def reset_circuit_breaker():
+    """清空熔断状态 (守护进程每一轮开始时调用，上一轮的熔断不延续到下一轮)"""
+    get_circuit_breaker().reset()
+
+def get_circuit_breaker():
+    """获取全局熔断器，首次调用时根据环境变量创建"""
+    global _circuit_breaker
+    with _init_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = breaker_from_env()
+        return _circuit_breaker
+
+def reuse_browser_enabled():
+    """是否启用浏览器复用模式 (NETLIB_REUSE_BROWSER)"""
+    return os.environ.get('NETLIB_REUSE_BROWSER', '').strip().lower() in ('1', 'true', 'yes')
+
+def reset_browser_state(driver):
+    """清空常驻浏览器的状态: 新标签页 + 清除 Cookie、缓存和站点存储"""
+    if isinstance(driver, CdpPage):
+        # 换用新的浏览器上下文，Cookie 和存储随旧上下文一起丢弃
+        driver.reset()
+        hide_automation(driver)
+        apply_resource_blocking(driver)
+        return
+    
+    # 新开标签页并关闭旧标签页，丢弃 sessionStorage 和页面状态
+    old_handles = driver.window_handles
+    driver.switch_to.new_window('tab')
+    for handle in old_handles:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(driver.window_handles[0])
+    
+    driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+    driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+        'origin': BASE_URL.rstrip('/'),
+        'storageTypes': 'all'
+    })
+    
+    # 隐藏脚本和资源屏蔽按标签页注册，新标签页需要重新设置
+    hide_automation(driver)
+    apply_resource_blocking(driver)
+
+def acquire_warm_driver(account_num):
+    """获取当前线程的常驻浏览器，首次调用时启动，之后只重置状态"""
+    driver = getattr(_warm, 'driver', None)
+    if driver is not None:
+        start = time.monotonic()
         try:
-            # 检查是否还有登录按钮
-            driver.find_element(By.LINK_TEXT, 'Login')
-            print("❌ 登录失败 - 页面上仍有登录按钮")
-            
-            # 尝试查找错误信息
-            try:
-                error_elements = driver.find_elements(By.XPATH, '//div[contains(@class, "error") or contains(text(), "Error") or contains(text(), "error")]')
-                for error_elem in error_elements:
-                    if error_elem.text.strip():
-                        print(f"❌ 错误信息: {error_elem.text.strip()}")
-            except:
-                pass
-                
-            return False
-        except NoSuchElementException:
-            print("✅ 登录成功 - 页面上没有登录按钮")
-            return True
+            reset_browser_state(driver)
         except Exception as e:
-            print(f"⚠️  检查登录状态时出错: {str(e)}")
-            # 即使检查失败，也继续，可能登录成功了
-            return True
-            
-    except TimeoutException:
-        print("❌ 操作超时 - 页面可能加载缓慢")
-        traceback.print_exc()
+            print(f"⚠️ 常驻浏览器状态重置失败，重新启动: {str(e)[:80]}")
+            discard_warm_driver(driver)
+        else:
+            elapsed = time.monotonic() - start
+            with _reuse_lock:
+                _reuse_stats['resets'] += 1
+                _reuse_stats['reset_seconds'] += elapsed
+            print(f"♻️ 账号 {account_num} 复用常驻浏览器 (状态重置 {elapsed:.2f} 秒)")
+            return driver
+    
+    print(f"\n🔄 为账号 {account_num} 启动常驻浏览器...")
+    start = time.monotonic()
+    driver = create_driver()
+    if not driver:
+        return None
+    elapsed = time.monotonic() - start
+    _warm.driver = driver
+    with _reuse_lock:
+        _warm_drivers.append(driver)
+        _reuse_stats['launches'] += 1
+        _reuse_stats['launch_seconds'] += elapsed
+    return driver
+
+def discard_warm_driver(driver):
+    """关闭并丢弃当前线程的常驻浏览器"""
+    _warm.driver = None
+    with _reuse_lock:
+        if driver in _warm_drivers:
+            _warm_drivers.remove(driver)
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+def close_warm_drivers():
+    """关闭所有常驻浏览器"""
+    with _reuse_lock:
+        drivers = list(_warm_drivers)
+        _warm_drivers.clear()
+    for driver in drivers:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    if drivers:
+        print(f"🔒 已关闭 {len(drivers)} 个常驻浏览器")
+
+def report_browser_reuse():
+    """打印复用模式相对每账号冷启动节省的时间"""
+    with _reuse_lock:
+        stats = dict(_reuse_stats)
+    if not stats['launches']:
+        return
+    
+    launch_avg = stats['launch_seconds'] / stats['launches']
+    print(f"\n浏览器复用统计:")
+    print(f"  冷启动次数: {stats['launches']} (平均 {launch_avg:.2f} 秒)")
+    if stats['resets']:
+        reset_avg = stats['reset_seconds'] / stats['resets']
+        saved = launch_avg - reset_avg
+        print(f"  状态重置次数: {stats['resets']} (平均 {reset_avg:.2f} 秒)")
+        print(f"  每账号节省: {saved:.2f} 秒 (共约 {saved * stats['resets']:.1f} 秒)")
+
+def report_memory_usage():
+    """打印内存控制器的调整次数和每个浏览器的峰值 RSS"""
+    if _memory_controller is None:
+        return
+    count, peak_max, peak_mean, peak_total = _memory_controller.summary()
+    print(f"\n内存控制统计:")
+    print(f"  并发调整: {_memory_controller.decisions} 次 (最终并发 {_memory_controller.limit}/"
+          f"{_memory_controller.max_workers})")
+    if count:
+        print(f"  单个浏览器峰值 RSS: 最大 {peak_max / MB:.0f} MB, 平均 {peak_mean / MB:.0f} MB "
+              f"({count} 个浏览器)")
+        print(f"  浏览器合计峰值 RSS: {peak_total / MB:.0f} MB")
+
+def get_backend():
+    """读取登录后端 (NETLIB_BACKEND): selenium (默认)、cdp (不经过 chromedriver 直连 Chrome) 或 http"""
+    backend = os.environ.get('NETLIB_BACKEND', 'selenium').strip().lower()
+    if backend not in ('selenium', 'cdp', 'http'):
+        print(f"⚠️ NETLIB_BACKEND 无效: {backend}，使用 selenium")
+        return 'selenium'
+    return backend
+
+def wait_for_login_slot(account_num):
+    """按站点限速排队，等待轮到当前账号"""
+    host = urlparse(BASE_URL).netloc
+    with phase('rate_wait'):
+        waited = get_rate_limiter().acquire(host)
+    if waited:
+        print(f"\n⏰ 限速等待 {waited:.1f} 秒后登录账号 {account_num}...")
+
+def process_account(username, password, account_num):
+    """登录单个账号，返回是否成功，并记录整个账号的耗时"""
+    set_account(account_num)
+    start = time.perf_counter()
+    success = False
+    try:
+        success = _process_account(username, password, account_num)
+        return success
+    finally:
+        elapsed = time.perf_counter() - start
+        record_phase('account', elapsed, success,
+                     outcome='success' if success else 'failed')
+        if _checkin_state is not None:
+            _checkin_state.record(username, success, elapsed)
+        if _deadline is not None:
+            _deadline.observe(elapsed)
+        note_progress(done=1)
+
+def out_of_time(delay):
+    """重试前检查时间预算，剩余时间不够等待时放弃重试"""
+    if _deadline is None or _deadline.remaining() > delay:
         return False
-    except Exception as e:
-        print(f"❌ 登录过程异常: {str(e)}")
-        traceback.print_exc()
+    print("⏳ 时间预算即将用完，不再重试")
+    return True
+
+def run_account(username, password, account_num):
+    """时间预算允许时登录账号，返回状态"""
+    if _deadline is not None:
+        entry = _checkin_state.get(username) if _checkin_state is not None else None
+        allowed, cost = _deadline.can_start((entry or {}).get('last_latency'))
+        if not allowed:
+            _deadline.defer()
+            note_progress(done=1)
+            print(f"⏳ 剩余 {max(0, _deadline.remaining()):.1f} 秒不足以登录账号 {account_num} "
+                  f"({username}，估计 {cost:.1f} 秒)，留到下次运行")
+            return STATUS_DEFERRED
+    success = process_account(username, password, account_num)
+    return STATUS_SUCCESS if success else STATUS_FAILED
+
+def run_account_logged(username, password, account_num):
+    """登录账号，按账号缓冲时该账号的输出在结束后整块写出"""
+    with account_output():
+        return run_account(username, password, account_num)
+
+def is_fresh_account(username, account_num):
+    """增量模式下，最近在新鲜窗口内成功过的账号不再登录"""
+    if _fresh_window is None or _checkin_state is None:
         return False
+    if not _checkin_state.is_fresh(username, _fresh_window):
+        return False
+    entry = _checkin_state.get(username)
+    hours = (time.time() - entry['last_success']) / 3600
+    note_progress(done=1)
+    print(f"⏭️ 账号 {account_num} ({username}) {hours:.1f} 小时前已成功签到，跳过")
+    return True
 
-def main():
-    """主函数"""
-    print("=" * 60)
-    print("浏览器修复版登录脚本 v3.0")
-    print(f"运行时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print("=" * 60)
+def _process_account(username, password, account_num):
+    """HTTP 后端遇到 JS 表单或验证页面时自动回退到浏览器"""
+    host = urlparse(BASE_URL).netloc
+    if not get_circuit_breaker().allow(host):
+        print(f"⛔ 站点 {host} 已熔断，账号 {account_num} ({username}) 直接判定失败")
+        count_stat('circuit_open')
+        return False
+    try:
+        return _login_with_backend(username, password, account_num, host)
+    finally:
+        # 探测账号在没有记录成功或失败时结束 (时间预算用完、浏览器无法启动等)，让下一个账号重新探测
+        get_circuit_breaker().abandon(host)
+
+def _login_with_backend(username, password, account_num, host):
+    if get_backend() != 'http':
+        return process_account_in_browser(username, password, account_num)
     
-    # 检查环境变量
-    print("\n1. 环境变量检查:")
-    accounts_str = os.environ.get('NETLIB_ACCOUNTS')
+    wait_for_login_slot(account_num)
+    breaker = get_circuit_breaker()
+    policy = get_retry_policy()
+    for attempt in range(1, policy.attempts + 1):
+        try:
+            success = http_login(username, password, account_num, BASE_URL,
+                                 pool_size=max(10, get_worker_count()))
+            breaker.record_success(host)
+            return success
+        except HttpFallback as e:
+            print(f"⚠️ HTTP 后端无法处理: {e}，回退到浏览器")
+            count_stat('http_fallback')
+            break
+        except Exception as e:
+            print(f"❌ HTTP 登录异常: {str(e)}")
+            if attempt >= policy.attempts or breaker.is_open(host):
+                breaker.record_failure(host)
+                return False
+            # HTTP 流程只有几个请求，整体重试即可
+            delay = policy.delay(attempt)
+            if out_of_time(delay):
+                return False
+            count_stat('phase_retries')
+            print(f"🔁 {delay:.1f} 秒后重试 HTTP 登录 (第 {attempt} 次重试)")
+            time.sleep(delay)
+    return process_account_in_browser(username, password, account_num, rate_limited=True)
+
+def set_browser_pool(pool):
+    """设置守护进程使用的浏览器池，之后的浏览器登录都从池中取用浏览器"""
+    global _browser_pool
+    _browser_pool = pool
+
+def start_browser(account_num, reuse):
+    """启动 (或复用) 浏览器，失败时按重试策略退避重试，只重试启动这一步"""
+    policy = get_retry_policy()
+    for attempt in range(1, policy.attempts + 1):
+        with phase('driver_start'):
+            if _browser_pool is not None:
+                driver = _browser_pool.acquire()
+            elif reuse:
+                driver = acquire_warm_driver(account_num)
+            else:
+                # 为每个账号创建新的浏览器实例
+                print(f"\n🔄 为账号 {account_num} 创建浏览器实例...")
+                driver = create_driver()
+        if driver or attempt >= policy.attempts:
+            return driver
+        delay = policy.delay(attempt)
+        count_stat('phase_retries')
+        print(f"🔁 {delay:.1f} 秒后重新创建浏览器 (第 {attempt} 次重试)")
+        time.sleep(delay)
+    return None
+
+def process_account_in_browser(username, password, account_num, rate_limited=False):
+    """使用浏览器登录单个账号，返回是否成功
+
+    默认每个账号使用独立的浏览器实例；复用模式下使用当前线程的常驻浏览器；
+    守护进程模式下从浏览器池取用，用完归还。
+    """
+    pool = _browser_pool
+    reuse = pool is None and reuse_browser_enabled()
+    driver = start_browser(account_num, reuse)
     
-    if not accounts_str:
-        print("❌ NETLIB_ACCOUNTS 环境变量未设置")
-        sys.exit(1)
+    if not driver:
+        print(f"❌ 无法为账号 {account_num} 创建浏览器，跳过")
+        return False
+    
+    # 浏览器启动完成后再排队，启动耗时计入限速间隔
+    if not rate_limited:
+        wait_for_login_slot(account_num)
+    
+    if reuse:
+        return login_account(driver, username, password, account_num)
     
-    print(f"✅ NETLIB_ACCOUNTS 设置 (长度: {len(accounts_str)})")
+    if pool is not None:
+        try:
+            return login_account(driver, username, password, account_num)
+        finally:
+            pool.release(driver)
     
-    # 解析账号
     try:
-        accounts = accounts_str.split(',')
-        print(f"✅ 解析出 {len(accounts)} 个账号")
-        
-        valid_accounts = []
+        return login_account(driver, username, password, account_num)
+    finally:
+        # 确保关闭浏览器
+        driver.quit()
+        print(f"🔒 账号 {account_num} 的浏览器已关闭")
+
+def run_accounts(accounts, workers=1):
+    """按顺序或使用线程池登录所有账号，结果顺序与输入一致"""
+    global _memory_controller
+    _memory_controller = controller_from_env(workers)
+    if _memory_controller:
+        if _browser_pool is not None:
+            # 守护进程的浏览器在上一轮或两轮之间启动，登记到本轮新建的控制器
+            for pid in _browser_pool.pids():
+                _memory_controller.register(pid)
+        if _cdp_browser:
+            # 守护进程的 CDP 直连 Chrome 跨轮次复用
+            _memory_controller.register(_cdp_browser.pid)
+        _memory_controller.start()
+    if buffering_enabled(workers):
+        install_account_log(get_progress)
+    try:
+        return _run_accounts(accounts, workers)
+    finally:
+        uninstall_account_log()
+        close_warm_drivers()
+        if _browser_pool is None:
+            # 守护进程的浏览器池跨轮次复用标签页，由守护进程退出时关闭
+            close_cdp_browser()
+        close_profile_template()
+        close_artifact_writer()
+        close_adapters()
+        if _memory_controller:
+            # 最后一次采样记下已关闭浏览器的峰值
+            _memory_controller.stop()
+
+def _run_accounts(accounts, workers):
+    if workers <= 1:
+        results = []
         for i, account in enumerate(accounts, 1):
-            account = account.strip()
-            if ':' in account:
-                username, password = account.split(':', 1)
-                username = username.strip()
-                password = password.strip()
-                if username and password:
-                    valid_accounts.append((username, password))
-                    print(f"   账号 {i}: {username}")
-                else:
-                    print(f"❌ 账号 {i} 格式错误: 用户名或密码为空")
-            else:
-                print(f"❌ 账号 {i} 格式错误: {account} (缺少冒号分隔符)")
-                
-        if not valid_accounts:
-            print("❌ 没有有效的账号配置")
-            sys.exit(1)
-                
+            note_progress(read=1)
+            if is_fresh_account(account.username, i):
+                results.append((account.username, STATUS_FRESH))
+                continue
+            results.append((account.username, run_account_logged(account.username, account.password, i)))
+        return results
+    
+    # 每个工作线程各自创建并关闭浏览器，互不共享驱动；
+    # 最多提前提交 2 倍并发数的账号，账号流不会被一次性读完
+    results = []
+    pending = deque()
+    controller = _memory_controller
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='login') as executor:
+        for i, account in enumerate(accounts, 1):
+            note_progress(read=1)
+            if len(pending) >= workers * 2:
+                results.append(collect_result(*pending.popleft()))
+            if is_fresh_account(account.username, i):
+                # 占位保持结果顺序与输入一致
+                pending.append((account.username, None))
+                continue
+            if controller:
+                # 内存余量不足时在这里等待，实际并发数不超过控制器的当前上限
+                controller.acquire()
+            future = executor.submit(run_account_logged, account.username, account.password, i)
+            if controller:
+                future.add_done_callback(lambda _: controller.release())
+            pending.append((account.username, future))
+        while pending:
+            results.append(collect_result(*pending.popleft()))
+    return results
+
+def collect_result(username, future):
+    """等待单个账号的登录线程结束，返回 (用户名, 状态)；future 为 None 表示已跳过"""
+    if future is None:
+        return (username, STATUS_FRESH)
+    try:
+        return (username, future.result())
+    except Exception as e:
+        print(f"❌ 账号 {username} 登录线程异常: {str(e)}")
+        traceback.print_exc()
+        return (username, STATUS_FAILED)
+
+def guard_account_stream(accounts):
+    """读取账号流出错时打印错误并停止读取，已读取的账号照常处理"""
+    try:
+        yield from accounts
     except Exception as e:
         print(f"❌ 解析账号失败: {str(e)}")
         traceback.print_exc()
-        sys.exit(1)
-    
-    # 登录每个账号
-    print(f"\n2. 开始登录 {len(valid_accounts)} 个账号:")
-    results = []
-    all_success = True
-    
-    for i, (username, password) in enumerate(valid_accounts, 1):
-        # 为每个账号创建新的浏览器实例
-        print(f"\n🔄 为账号 {i} 创建浏览器实例...")
-        driver = create_driver()
-        
-        if not driver:
-            print(f"❌ 无法为账号 {i} 创建浏览器，跳过")
-            results.append((username, False))
-            all_success = False
-            continue
-        
-        # 登录前等待，避免被检测
-        wait_time = 5 + (i * 2)
-        print(f"\n⏰ 等待 {wait_time} 秒后登录账号 {i}...")
-        time.sleep(wait_time)
-        
-        try:
-            success = login_account(driver, username, password, i)
-            results.append((username, success))
-            if not success:
-                all_success = False
-        finally:
-            # 确保关闭浏览器
-            if driver:
-                driver.quit()
-                print(f"🔒 账号 {i} 的浏览器已关闭")
+
+def configure_checkin_state(shard=None):
+    """根据环境变量设置签到状态存储和增量模式"""
+    global _checkin_state, _fresh_window
+    _checkin_state = state_from_env(shard)
+    _fresh_window = incremental_from_env()
+    if _fresh_window is not None:
+        if _checkin_state is None:
+            print("⚠️ 增量模式需要 NETLIB_STATE_FILE，本次登录全部账号")
+        else:
+            print(f"⏭️ 增量模式: 跳过 {_fresh_window / 3600:g} 小时内已成功的账号")
+
+def configure_deadline():
+    """根据 NETLIB_TIME_BUDGET 开启时间预算调度，从调用时开始计时"""
+    global _deadline
+    _deadline = scheduler_from_env()
+    if _deadline is not None:
+        print(f"⏳ 时间预算: {_deadline.budget:g} 秒 (保留 {_deadline.reserve:g} 秒用于汇总和结果文件)")
+
+def prioritize_accounts(accounts):
+    """开启时间预算时按优先级排序账号 (最久未成功的优先)"""
+    if _deadline is None or priority_mode() != 'stale':
+        return accounts
+    ordered = order_by_staleness(accounts, _checkin_state)
+    print(f"📋 已按上次成功时间排序 {len(ordered)} 个账号，最久未成功的优先")
+    return ordered
+
+def report_deadline():
+    """打印时间预算的使用情况"""
+    if _deadline is None:
+        return
+    print(f"\n时间预算: 已用 {_deadline.elapsed():.0f} / {_deadline.budget:.0f} 秒, "
+          f"未开始的账号 {_deadline.deferred} 个")
+
+def save_checkin_state():
+    """写回签到状态，失败不影响本次结果"""
+    if _checkin_state is None:
+        return
+    try:
+        _checkin_state.save()
+    except Exception as e:
+        print(f"⚠️ 签到状态保存失败: {str(e)}")
+
+def report_results(results):
+    """打印结果汇总并返回退出码: 0 全部成功, 2 部分成功, 1 全部失败
+
+    增量模式跳过的账号 (近期已成功) 按成功计入退出码。
+    """
+    counts = Counter(status for _, status in results)
+    success_count = sum(counts[status] for status in SUCCESS_STATUSES)
     
-    # 生成结果报告
     print(f"\n{'=' * 60}")
     print("登录结果汇总")
     print(f"{'=' * 60}")
     print(f"总账号数: {len(results)}")
-    print(f"成功登录: {sum(1 for _, success in results if success)} 个")
-    print(f"登录失败: {sum(1 for _, success in results if not success)} 个")
+    print(f"成功登录: {counts[STATUS_SUCCESS]} 个")
+    if counts[STATUS_FRESH]:
+        print(f"跳过 (近期已成功): {counts[STATUS_FRESH]} 个")
+    if counts[STATUS_DEFERRED]:
+        print(f"未开始 (时间预算不足): {counts[STATUS_DEFERRED]} 个")
+    print(f"登录失败: {len(results) - success_count - counts[STATUS_DEFERRED]} 个")
     
+    labels = {STATUS_SUCCESS: "✅ 成功", STATUS_FRESH: "⏭️ 跳过 (近期已成功)",
+              STATUS_DEFERRED: "⏳ 未开始 (时间预算不足)"}
     print(f"\n详细结果:")
-    for i, (username, success) in enumerate(results, 1):
-        status = "✅ 成功" if success else "❌ 失败"
-        print(f"  账号 {i}: {username} - {status}")
+    for i, (username, status) in enumerate(results, 1):
+        print(f"  账号 {i}: {username} - {labels.get(status, '❌ 失败')}")
+    
+    with _stats_lock:
+        fast_path = _run_stats['session_fast_path']
+        http_fallback = _run_stats['http_fallback']
+        retries = _run_stats['phase_retries']
+        circuit_open = _run_stats['circuit_open']
+    if fast_path:
+        print(f"\n会话复用 (跳过表单登录): {fast_path} 个")
+    if http_fallback:
+        print(f"HTTP 后端回退到浏览器: {http_fallback} 个")
+    if retries:
+        print(f"阶段重试: {retries} 次")
+    if circuit_open:
+        print(f"熔断快速失败: {circuit_open} 个")
     
     print(f"\n{'=' * 60}")
     
-    if all_success:
-        print("🎉 所有账号登录成功！")
-        sys.exit(0)
-    elif sum(1 for _, success in results if success) > 0:
+    if results and success_count == len(results):
+        print("🎉 所有账号登录成功！" if counts[STATUS_SUCCESS] else "🎉 所有账号近期均已成功签到")
+        return 0
+    elif success_count > 0:
         print("⚠️  部分账号登录成功")
-        sys.exit(2)
+        return 2
     else:
         print("❌ 所有账号登录失败")
+        return 1
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='浏览器修复版登录脚本')
+    parser.add_argument('--shard', default=os.environ.get('NETLIB_SHARD') or None,
+                        help='只处理第 i 个分片 (共 N 个)，格式 i/N，按用户名哈希稳定分配')
+    parser.add_argument('--results-file', default=os.environ.get('NETLIB_RESULTS_FILE') or None,
+                        help='结果 JSON 文件 (分片模式默认 results_shard_i_of_N.json)')
+    parser.add_argument('--merge', nargs='+', metavar='FILE',
+                        help='合并多个分片的结果文件，输出汇总和退出码')
+    return parser.parse_args(argv)
+
+def merge_main(paths):
+    """合并分片结果文件，打印与单次运行相同的汇总并返回退出码"""
+    print("=" * 60)
+    print(f"合并 {len(paths)} 个分片结果")
+    print("=" * 60)
+    try:
+        results, stats, warnings = load_results(paths)
+    except Exception as e:
+        print(f"❌ 读取结果文件失败: {str(e)}")
+        traceback.print_exc()
+        return 1
+    
+    for warning in warnings:
+        print(f"⚠️ {warning}")
+    with _stats_lock:
+        _run_stats.update(stats)
+    
+    exit_code = report_results(results)
+    if exit_code == 0 and warnings:
+        print("⚠️  分片不完整，按部分成功处理")
+        return 2
+    return exit_code
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    if args.merge:
+        sys.exit(merge_main(args.merge))
+    
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    results_file = args.results_file or (default_results_path(*shard) if shard else None)
+    
+    print("=" * 60)
+    print("浏览器修复版登录脚本 v3.0")
+    print(f"运行时间: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 60)
+    
+    configure_tracing_from_env()
+    
+    configure_checkin_state(shard)
+    configure_deadline()
+    
+    # 检查账号来源
+    print("\n1. 账号来源检查:")
+    source = open_account_source()
+    
+    if not source:
+        print("❌ 未找到账号配置 (NETLIB_ACCOUNTS / NETLIB_ACCOUNTS_FILE / NETLIB_ACCOUNTS_JSON / NETLIB_USERNAME1)")
         sys.exit(1)
+    
+    description, items = source
+    print(f"✅ 使用账号来源: {description}")
+    
+    # 账号按需逐个解析并交给调度器
+    workers = get_worker_count()
+    print(f"\n2. 开始登录账号 (并发数: {workers}):")
+    accounts = guard_account_stream(iter_valid_accounts(items))
+    if shard:
+        print(f"🧩 分片模式: 只处理分片 {shard[0]}/{shard[1]} 的账号")
+        accounts = filter_shard(accounts, *shard)
+    accounts = prioritize_accounts(accounts)
+    results = run_accounts(accounts, workers)
+    
+    if not results and not shard:
+        print("❌ 没有有效的账号配置")
+        close_tracing()
+        sys.exit(1)
+    
+    report_browser_reuse()
+    report_memory_usage()
+    report_deadline()
+    save_selector_cache()
+    save_checkin_state()
+    close_tracing()
+    
+    if results_file:
+        with _stats_lock:
+            stats = dict(_run_stats)
+        write_results(results_file, results, shard, stats)
+        print(f"💾 结果已写入: {results_file}")
+    if shard and not results:
+        # 分片可能恰好没有分配到账号，这不是错误
+        print(f"ℹ️ 分片 {shard[0]}/{shard[1]} 没有分配到账号")
+        sys.exit(0)
+    
+    # 生成结果报告
+    sys.exit(report_results(results))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录表单填写 - 批量模式在一次脚本调用中填值、触发事件并提交；逐键模式模拟真人输入
+
+批量模式通过原生 value setter 赋值，React/Vue 等框架监听的 input/change 事件照常触发；
+需要真实键盘事件的站点 (反机器人检测) 用 NETLIB_FILL_MODE 按站点切换为逐键模式:
+  NETLIB_FILL_MODE=keys                      所有站点逐键输入
+  NETLIB_FILL_MODE=batch,www.netlib.re=keys  默认批量，指定站点逐键输入
+"""
+
+import os
+import random
+import time
+
+FILL_MODES = ('batch', 'keys')
+
+# 参数: [[元素, 值], ...]、提交按钮、跳转标记名
+# 返回 [是否已提交, 提交前的 URL, 值未生效的字段序号]
+FILL_AND_SUBMIT_JS = """
+const fields = arguments[0];
+const submit = arguments[1];
+const marker = arguments[2];
+const nativeSetter = (el) => {
+    // 取原型链上的原生 setter，绕过框架在实例上覆盖的 value 属性
+    let proto = Object.getPrototypeOf(el);
+    while (proto) {
+        const descriptor = Object.getOwnPropertyDescriptor(proto, 'value');
+        if (descriptor && descriptor.set) return descriptor.set;
+        proto = Object.getPrototypeOf(proto);
+    }
+    return null;
+};
+const mismatched = [];
+fields.forEach(([el, value], i) => {
+    el.focus();
+    const setter = nativeSetter(el);
+    if (setter) setter.call(el, value); else el.value = value;
+    el.dispatchEvent(new InputEvent('input', {bubbles: true, inputType: 'insertText', data: value}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    el.blur();
+    if (el.value !== value) mismatched.push(i);
+});
+const href = location.href;
+if (mismatched.length) return [false, href, mismatched];
+window[marker] = true;
+// 延迟到脚本返回后再点击，避免跳转打断本次脚本调用
+setTimeout(() => submit.click(), 0);
+return [true, href, mismatched];
+"""
+
+
+def fill_mode(host, environ=None):
+    """读取站点的表单填写模式: batch (默认) 或 keys"""
+    environ = os.environ if environ is None else environ
+    mode = 'batch'
+    for item in environ.get('NETLIB_FILL_MODE', '').split(','):
+        item = item.strip().lower()
+        if not item:
+            continue
+        site, _, value = item.rpartition('=')
+        if value not in FILL_MODES:
+            print(f"⚠️ NETLIB_FILL_MODE 无效: {item}，忽略")
+            continue
+        if not site:
+            mode = value
+        elif site == host.lower():
+            # 站点设置优先于默认设置，与书写顺序无关
+            return value
+    return mode
+
+
+def fill_and_submit(driver, fields, submit, marker):
+    """批量填写并提交，返回 (是否已提交, 提交前的 URL, 未生效的字段序号)
+
+    有字段的值被页面改写时不提交，由调用方改用逐键输入。
+    """
+    submitted, url_before, mismatched = driver.execute_script(
+        FILL_AND_SUBMIT_JS, [[element, value] for element, value in fields], submit, marker
+    )
+    return submitted, url_before, mismatched
+
+
+def type_like_human(element, text):
+    """逐个字符输入，字符之间随机停顿 (NETLIB_KEY_DELAY 秒，默认 0.05)"""
+    value = os.environ.get('NETLIB_KEY_DELAY', '').strip()
+    try:
+        delay = float(value) if value else 0.05
+    except ValueError:
+        delay = 0.05
+    element.clear()
+    for char in text:
+        element.send_keys(char)
+        if delay > 0:
+            time.sleep(random.uniform(delay, delay * 3))
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+无浏览器登录后端 - 直接用 HTTP 提交登录表单，遇到 JS 表单或验证页面时回退到浏览器
+"""
+
+import threading
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from account_log import debug
+from login_metrics import phase
+from login_outcome import FAILURE, SUCCESS, classify_login_state
+
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+)
+
+# 验证/挑战页面的特征文本
+CHALLENGE_MARKERS = (
+    'cf-challenge',
+    'challenge-platform',
+    'cf-chl-',
+    'just a moment...',
+    'checking your browser',
+    'g-recaptcha',
+    'h-captcha',
+    'enable javascript and cookies to continue',
+)
+
+USERNAME_HINTS = ('user', 'login', 'email', 'account')
+
+# 所有账号共享连接池 (按连接池大小区分)，保持长连接；Cookie 仍按账号隔离在各自的 Session 中。
+# 连接池只在运行结束时由 close_adapters 关闭，账号结束时不关闭 Session (Session.close 会清空共享的连接池)
+_adapters = {}
+_adapter_lock = threading.Lock()
+
+
+class HttpFallback(Exception):
+    """HTTP 后端无法处理当前页面，需要回退到浏览器"""
+
+
+class LoginPageParser(HTMLParser):
+    """提取页面中的表单、链接和错误信息"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms = []
+        self.links = []
+        self.errors = []
+        self._form = None
+        self._link = None
+        self._error_depth = 0
+        self._error_text = []
+        self._in_script = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: (value or '') for name, value in attrs}
+        if tag in ('script', 'style'):
+            self._in_script = True
+        elif tag == 'form':
+            self._form = {
+                'action': attrs.get('action', ''),
+                'method': attrs.get('method', 'get').lower(),
+                'fields': [],
+            }
+            self.forms.append(self._form)
+        elif tag in ('input', 'button', 'select', 'textarea') and self._form is not None:
+            field = dict(attrs)
+            field['tag'] = tag
+            field.setdefault('type', 'submit' if tag == 'button' else 'text')
+            field['type'] = field['type'].lower()
+            self._form['fields'].append(field)
+        elif tag == 'a':
+            self._link = {'href': attrs.get('href', ''), 'text': ''}
+            self.links.append(self._link)
+
+        if self._error_depth:
+            self._error_depth += 1
+        elif tag == 'div' and 'error' in attrs.get('class', ''):
+            self._error_depth = 1
+            self._error_text = []
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style'):
+            self._in_script = False
+        elif tag == 'form':
+            self._form = None
+        elif tag == 'a':
+            self._link = None
+        if self._error_depth:
+            self._error_depth -= 1
+            if not self._error_depth:
+                text = ' '.join(''.join(self._error_text).split())
+                if text:
+                    self.errors.append(text)
+
+    def handle_data(self, data):
+        if self._in_script:
+            return
+        if self._link is not None:
+            self._link['text'] += data
+        if self._error_depth:
+            self._error_text.append(data)
+        elif 'error' in data.lower() and data.strip():
+            # 与浏览器端一致: 文本中包含 Error/error 的块也视为错误信息
+            self.errors.append(data.strip())
+
+
+def parse_page(html):
+    parser = LoginPageParser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def has_login_link(page):
+    return any(link['text'].strip() == 'Login' for link in page.links)
+
+
+def has_logout_link(page):
+    return any(link['text'].strip().lower() in ('logout', 'log out', 'sign out')
+               or 'logout' in link['href'].lower() for link in page.links)
+
+
+def page_state(response, page, session):
+    """把解析后的页面转换成与浏览器端 LOGIN_STATE_JS 相同的状态快照"""
+    return {
+        'url': response.url,
+        'readyState': 'complete',
+        'cookies': list(session.cookies.keys()),
+        'hasLoginLink': has_login_link(page),
+        'hasLogoutLink': has_logout_link(page),
+        'hasPasswordField': find_login_form(page) is not None,
+        'errors': page.errors,
+    }
+
+
+def is_challenge(response):
+    text = response.text[:20000].lower()
+    return any(marker in text for marker in CHALLENGE_MARKERS)
+
+
+def get_adapter(pool_size=10):
+    """获取指定大小的共享连接池"""
+    with _adapter_lock:
+        adapter = _adapters.get(pool_size)
+        if adapter is None:
+            adapter = _adapters[pool_size] = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        return adapter
+
+
+def close_adapters():
+    """关闭所有共享连接池 (运行结束时调用)"""
+    with _adapter_lock:
+        adapters = list(_adapters.values())
+        _adapters.clear()
+    for adapter in adapters:
+        adapter.close()
+
+
+def new_session(pool_size=10):
+    """创建挂载共享连接池的会话，每个账号一个，Cookie 互不干扰
+
+    用完后不要调用 close (也不要用作 with 语句)，否则共享连接池中的连接会被全部关闭。
+    """
+    session = requests.Session()
+    adapter = get_adapter(pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def find_login_form(page):
+    """找到包含密码输入框的表单"""
+    for form in page.forms:
+        if any(field['type'] == 'password' for field in form['fields']):
+            return form
+    return None
+
+
+def fill_login_form(form, username, password):
+    """按表单字段填入用户名和密码，保留隐藏字段 (例如 CSRF token)"""
+    data = {}
+    username_field = None
+    password_field = None
+    text_fields = []
+    submit_field = None
+
+    for field in form['fields']:
+        name = field.get('name')
+        field_type = field['type']
+        if field_type == 'password':
+            password_field = password_field or field
+        elif field_type in ('text', 'email') and field['tag'] == 'input':
+            text_fields.append(field)
+        elif field_type == 'submit':
+            submit_field = submit_field or field
+        elif name and field_type not in ('checkbox', 'radio', 'button', 'reset', 'file', 'image'):
+            data[name] = field.get('value', '')
+        elif name and field_type in ('checkbox', 'radio') and 'checked' in field:
+            data[name] = field.get('value', 'on')
+
+    for field in text_fields:
+        hint = ' '.join(field.get(key, '') for key in ('name', 'id', 'placeholder')).lower()
+        if any(word in hint for word in USERNAME_HINTS):
+            username_field = field
+            break
+    if username_field is None and text_fields:
+        username_field = text_fields[0]
+
+    if not password_field or not username_field:
+        return None
+    if not password_field.get('name') or not username_field.get('name'):
+        # 没有 name 属性的字段只能由页面脚本提交
+        return None
+
+    for field in text_fields:
+        if field is not username_field and field.get('name'):
+            data[field['name']] = field.get('value', '')
+    data[username_field['name']] = username
+    data[password_field['name']] = password
+    if submit_field and submit_field.get('name'):
+        data[submit_field['name']] = submit_field.get('value', '')
+    return data
+
+
+def http_login(username, password, account_num, base_url, pool_size=10):
+    """使用 HTTP 请求登录单个账号，返回是否成功
+
+    页面依赖 JS 渲染表单或出现验证页面时抛出 HttpFallback。
+    """
+    print(f"\n{'=' * 60}")
+    print(f"账号 {account_num}: {username} (HTTP 后端)")
+    print(f"{'=' * 60}")
+
+    session = new_session(pool_size)
+    try:
+        with phase('navigate'):
+            print("📥 正在访问网站...")
+            response = session.get(base_url, timeout=20)
+            if is_challenge(response):
+                raise HttpFallback('首页出现验证页面')
+            response.raise_for_status()
+
+        with phase('login_page'):
+            home = parse_page(response.text)
+            login_url = urljoin(response.url, 'login')
+            for link in home.links:
+                if link['text'].strip() == 'Login' or 'login' in link['href']:
+                    login_url = urljoin(response.url, link['href'])
+                    break
+
+            debug(f"🔍 正在打开登录页面: {login_url}")
+            response = session.get(login_url, timeout=20)
+            if is_challenge(response):
+                raise HttpFallback('登录页面出现验证页面')
+            response.raise_for_status()
+
+        with phase('fill'):
+            form = find_login_form(parse_page(response.text))
+            if form is None:
+                raise HttpFallback('页面中没有可直接提交的登录表单 (可能由 JS 渲染)')
+            data = fill_login_form(form, username, password)
+            if data is None:
+                raise HttpFallback('登录表单字段缺少 name 属性 (可能由 JS 提交)')
+            debug(f"✅ 找到登录表单，字段: {', '.join(sorted(data))}")
+
+        with phase('submit'):
+            # 提交前的快照: 成功判定需要离开登录页面或出现新的 Cookie 等正面信号
+            baseline = {'url': response.url, 'cookies': list(session.cookies.keys())}
+            action = urljoin(response.url, form['action'])
+            if form['method'] == 'post':
+                response = session.post(action, data=data, timeout=20)
+            else:
+                response = session.get(action, params=data, timeout=20)
+            if is_challenge(response):
+                raise HttpFallback('提交后出现验证页面')
+            # 5xx 等错误交给重试和熔断处理，不参与登录结果判定
+            response.raise_for_status()
+            print("✅ 登录提交成功")
+
+        debug("🔍 正在检查登录状态...")
+        with phase('outcome') as span:
+            result = parse_page(response.text)
+            outcome = classify_login_state(page_state(response, result, session), final=True, baseline=baseline)
+            span['outcome'] = outcome.status
+        if outcome.status == SUCCESS:
+            print(f"✅ 登录成功 - {outcome.message}")
+            return True
+        if outcome.status == FAILURE:
+            print(f"❌ 登录失败 - {outcome.message}")
+        else:
+            print(f"⚠️  无法确定登录状态 - {outcome.message}")
+        return False
+    finally:
+        # 只丢弃本账号的 Cookie，连接留在共享连接池中给下一个账号复用
+        session.cookies.clear()
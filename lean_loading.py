@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+精简加载 - 通过 CDP Network.setBlockedURLs 屏蔽登录用不到的资源，并使用 eager 页面加载策略
+
+NETLIB_LEAN=1 开启；登录流程只需要几个表单元素，图片、字体和第三方统计脚本都不必下载。
+  NETLIB_LEAN_TYPES       屏蔽的资源类型 (默认 image,font,media，可选 stylesheet)
+  NETLIB_LEAN_BLOCK       额外屏蔽的 URL 通配模式，逗号分隔 (默认屏蔽常见统计/广告域名)
+  NETLIB_PAGE_LOAD_STRATEGY  页面加载策略 normal/eager/none (精简模式默认 eager)
+"""
+
+import os
+
+# 资源类型对应的 URL 通配模式 (setBlockedURLs 只按完整 URL 匹配，
+# blocked_url_patterns 为每个模式加上 '?*' 变体，带查询参数或缓存版本号的资源同样屏蔽)
+RESOURCE_TYPE_PATTERNS = {
+    'image': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp', '*.avif'],
+    'font': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    'media': ['*.mp4', '*.webm', '*.mp3', '*.ogg', '*.wav'],
+    'stylesheet': ['*.css'],
+}
+
+DEFAULT_TYPES = 'image,font,media'
+
+DEFAULT_BLOCKED_URLS = [
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*googlesyndication.com*',
+    '*facebook.net*',
+    '*hotjar.com*',
+]
+
+PAGE_LOAD_STRATEGIES = ('normal', 'eager', 'none')
+
+# 从 Navigation/Resource Timing 读取当前页面的传输字节数和加载耗时
+# 跨域资源没有 Timing-Allow-Origin 时 transferSize 为 0，结果是下限
+PAGE_STATS_JS = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = nav ? nav.transferSize : 0;
+for (const entry of resources) bytes += entry.transferSize || 0;
+return {
+    url: location.href,
+    bytes: bytes,
+    resources: resources.length,
+    dom_ms: nav && nav.domContentLoadedEventEnd ? nav.domContentLoadedEventEnd : null,
+    load_ms: nav && nav.loadEventEnd ? nav.loadEventEnd : null
+};
+"""
+
+
+def lean_mode_enabled():
+    return os.environ.get('NETLIB_LEAN', '').strip().lower() in ('1', 'true', 'yes')
+
+
+def page_load_strategy():
+    """NETLIB_PAGE_LOAD_STRATEGY 优先；未设置时精简模式用 eager，否则用 normal"""
+    value = os.environ.get('NETLIB_PAGE_LOAD_STRATEGY', '').strip().lower()
+    if value in PAGE_LOAD_STRATEGIES:
+        return value
+    if value:
+        print(f"⚠️ NETLIB_PAGE_LOAD_STRATEGY 无效: {value}，使用默认值")
+    return 'eager' if lean_mode_enabled() else 'normal'
+
+
+def blocked_url_patterns():
+    """精简模式下要屏蔽的 URL 通配模式列表"""
+    patterns = []
+    types = os.environ.get('NETLIB_LEAN_TYPES', DEFAULT_TYPES)
+    for name in types.split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in RESOURCE_TYPE_PATTERNS:
+            print(f"⚠️ NETLIB_LEAN_TYPES 中的资源类型无效: {name}，忽略")
+            continue
+        for pattern in RESOURCE_TYPE_PATTERNS[name]:
+            patterns.extend((pattern, pattern + '?*'))
+    extra = os.environ.get('NETLIB_LEAN_BLOCK')
+    if extra is None:
+        patterns.extend(DEFAULT_BLOCKED_URLS)
+    else:
+        patterns.extend(item.strip() for item in extra.split(',') if item.strip())
+    return patterns
+
+
+def apply_resource_blocking(driver):
+    """在当前标签页开启 URL 屏蔽 (按标签页生效，新标签页需要重新调用)"""
+    if not lean_mode_enabled():
+        return
+    patterns = blocked_url_patterns()
+    if not patterns:
+        return
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+
+
+def measure_page(driver):
+    """读取当前页面的传输字节数、资源数和加载耗时，失败时返回 None"""
+    try:
+        return driver.execute_script(PAGE_STATS_JS)
+    except Exception:
+        return None
+
+
+def format_page_stats(stats):
+    load = stats.get('load_ms') or stats.get('dom_ms')
+    kind = 'load' if stats.get('load_ms') else 'DOMContentLoaded'
+    timing = f"{load:.0f} ms ({kind})" if load else '未完成'
+    return f"{stats['bytes'] / 1024:.1f} KB, {stats['resources']} 个资源, {timing}"
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录流程分阶段计时 - 默认关闭
+
+基准测试时开启内存收集；设置 NETLIB_TRACE_FILE 时把每个阶段写成一行 JSON (span)。
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_enabled = False
+_records = []
+_trace_file = None
+_context = threading.local()
+
+
+class _NullSpan:
+    """关闭计时时使用的空 span，忽略所有标注"""
+
+    def __setitem__(self, key, value):
+        pass
+
+    def update(self, *args, **kwargs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable_metrics():
+    """开启计时并清空已有记录"""
+    global _enabled
+    with _lock:
+        _enabled = True
+        _records.clear()
+
+
+def metrics_enabled():
+    return _enabled
+
+
+def enable_tracing(path):
+    """把 span 以 JSONL 格式追加写入文件"""
+    global _trace_file
+    with _lock:
+        if _trace_file is not None:
+            _trace_file.close()
+        _trace_file = open(path, 'a', encoding='utf-8', buffering=1)
+
+
+def configure_tracing_from_env():
+    """NETLIB_TRACE_FILE 设置时开启 span 输出 (文件名建议以 .log 结尾以便上传)"""
+    path = os.environ.get('NETLIB_TRACE_FILE', '').strip()
+    if path:
+        enable_tracing(path)
+        print(f"✅ 阶段计时输出到: {path}")
+
+
+def close_tracing():
+    global _trace_file
+    with _lock:
+        if _trace_file is not None:
+            _trace_file.close()
+            _trace_file = None
+
+
+def set_account(account_num):
+    """设置当前线程正在处理的账号序号"""
+    _context.account = account_num
+
+
+def current_account():
+    return getattr(_context, 'account', None)
+
+
+def annotate(**fields):
+    """给当前线程最内层的 span 添加字段 (例如命中的选择器)"""
+    stack = getattr(_context, 'spans', None)
+    if stack:
+        stack[-1].update(fields)
+
+
+def record_phase(phase, seconds, ok=True, **fields):
+    """记录一个阶段的耗时"""
+    if not _enabled and _trace_file is None:
+        return
+    record = {
+        'account': current_account(),
+        'phase': phase,
+        'seconds': seconds,
+        'ok': ok,
+    }
+    record.update(fields)
+    with _lock:
+        if _enabled:
+            _records.append(record)
+        if _trace_file is not None:
+            span = {
+                'ts': time.time(),
+                'account': record['account'],
+                'phase': phase,
+                'duration_ms': round(seconds * 1000, 3),
+                'outcome': record.get('outcome') or ('ok' if ok else 'error'),
+            }
+            span.update((k, v) for k, v in record.items()
+                        if k not in ('account', 'phase', 'seconds', 'ok', 'outcome'))
+            _trace_file.write(json.dumps(span, ensure_ascii=False) + '\n')
+
+
+@contextmanager
+def phase(name, **fields):
+    """计时上下文，返回可标注的 span: 正常结束记为成功，抛出异常记为失败
+
+    计时关闭时直接返回空 span，不做任何计时。
+    """
+    if not _enabled and _trace_file is None:
+        yield _NULL_SPAN
+        return
+    span = dict(fields)
+    stack = getattr(_context, 'spans', None)
+    if stack is None:
+        stack = _context.spans = []
+    stack.append(span)
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield span
+        ok = True
+    finally:
+        stack.pop()
+        record_phase(name, time.perf_counter() - start, ok, **span)
+
+
+def get_records():
+    with _lock:
+        return list(_records)
+
+
+def percentile(values, pct):
+    """最近秩百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(records):
+    """按阶段汇总次数、失败数和 p50/p95/p99 耗时 (秒)"""
+    by_phase = {}
+    for record in records:
+        by_phase.setdefault(record['phase'], []).append(record)
+    summary = {}
+    for name, items in by_phase.items():
+        values = [item['seconds'] for item in items]
+        summary[name] = {
+            'count': len(items),
+            'failed': sum(1 for item in items if not item['ok']),
+            'mean': sum(values) / len(values),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+            'max': max(values),
+        }
+    return summary
+
+
+def summarize_pages(records):
+    """按页面汇总 page_load 记录: 次数、平均传输字节数、资源数和 p50/p95 加载耗时 (秒)"""
+    by_page = {}
+    for record in records:
+        if record['phase'] == 'page_load':
+            by_page.setdefault(record.get('page'), []).append(record)
+    summary = {}
+    for name, items in by_page.items():
+        values = [item['seconds'] for item in items]
+        summary[name] = {
+            'count': len(items),
+            'bytes': sum(item.get('bytes', 0) for item in items) / len(items),
+            'resources': sum(item.get('resources', 0) for item in items) / len(items),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+        }
+    return summary
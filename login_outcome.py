@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录结果判定 - 一次浏览器端求值同时检查 URL、Cookie、登录链接和错误信息
+"""
+
+import time
+from collections import namedtuple
+
+SUCCESS = 'success'
+FAILURE = 'failure'
+UNKNOWN = 'unknown'
+
+# status: success / failure / unknown; message: 页面错误信息或判定原因
+LoginOutcome = namedtuple('LoginOutcome', 'status message url')
+
+# 页面状态快照，浏览器后端和 HTTP 后端都转换成同样的字段再判定；
+# 错误信息只在登录表单仍在页面上时收集，且只算可见的元素
+LOGIN_STATE_JS = """
+const isVisible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+const linkText = (a) => (a.innerText || a.textContent || '').trim();
+const links = Array.from(document.querySelectorAll('a'));
+const hasLoginLink = links.some(a => linkText(a) === 'Login');
+const hasLogoutLink = links.some(a => /^(logout|log out|sign out)$/i.test(linkText(a))
+    || /logout/i.test(a.getAttribute('href') || ''));
+const hasPasswordField = Array.from(document.querySelectorAll('input[type="password"]'))
+    .some(isVisible);
+const errors = [];
+if (hasLoginLink || hasPasswordField) {
+    const xpath = '//div[contains(@class, "error") or contains(text(), "Error") or contains(text(), "error")]';
+    const snapshot = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (let i = 0; i < snapshot.snapshotLength; i++) {
+        const node = snapshot.snapshotItem(i);
+        if (!isVisible(node)) continue;
+        const text = (node.innerText || '').trim();
+        if (text && !errors.includes(text)) errors.push(text);
+    }
+}
+return {
+    url: location.href,
+    readyState: document.readyState,
+    cookies: document.cookie ? document.cookie.split(';').map(c => c.split('=')[0].trim()) : [],
+    hasLoginLink: hasLoginLink,
+    hasLogoutLink: hasLogoutLink,
+    hasPasswordField: hasPasswordField,
+    errors: errors
+};
+"""
+
+
+def success_signals(state, baseline=None):
+    """登录成功的正面信号: 退出链接、离开登录页面、提交后新增的 Cookie
+
+    baseline 为提交前的快照 (可只含 url 或 cookies)，没有时只看退出链接。
+    """
+    signals = []
+    if state.get('hasLogoutLink'):
+        signals.append('页面上有退出链接')
+    if baseline:
+        before = baseline.get('url') or ''
+        url = state.get('url') or ''
+        if 'login' in before.lower() and url != before and 'login' not in url.lower():
+            signals.append('已离开登录页面')
+        if 'cookies' in baseline:
+            added = [name for name in state.get('cookies') or [] if name not in baseline['cookies']]
+            if added:
+                signals.append(f"新增 Cookie: {', '.join(added[:5])}")
+    return signals
+
+
+def classify_login_state(state, final=False, baseline=None):
+    """根据页面状态快照判定登录结果
+
+    成功需要正面信号 (见 success_signals)，只是没有登录按钮的页面 (错误页、空白页) 不算成功；
+    失败需要登录表单仍在页面上。
+    final 为 False 时，尚未出现决定性信号则返回 None，调用方继续等待；
+    final 为 True 时 (等待已超时) 必须给出结论，没有决定性信号时为 UNKNOWN (可重试)。
+    """
+    url = state.get('url', '')
+    on_form = state.get('hasLoginLink') or state.get('hasPasswordField')
+    errors = state.get('errors') or []
+    if on_form and errors:
+        return LoginOutcome(FAILURE, '; '.join(errors), url)
+
+    loaded = state.get('readyState') == 'complete'
+    if not on_form and loaded:
+        signals = success_signals(state, baseline)
+        if signals:
+            return LoginOutcome(SUCCESS, '页面上没有登录按钮, ' + ', '.join(signals), url)
+
+    if not final:
+        return None
+    if on_form:
+        return LoginOutcome(FAILURE, '页面上仍有登录按钮', url)
+    if not loaded:
+        return LoginOutcome(UNKNOWN, f"页面未加载完成 (readyState={state.get('readyState')})", url)
+    return LoginOutcome(UNKNOWN, '页面上没有登录按钮，但也没有登录成功的信号', url)
+
+
+def detect_login_outcome(driver, timeout=10, interval=0.2, baseline=None):
+    """在超时时间内轮询页面状态，出现决定性信号立即返回 LoginOutcome"""
+    deadline = time.monotonic() + timeout
+    state = None
+    while True:
+        final = time.monotonic() >= deadline
+        try:
+            state = driver.execute_script(LOGIN_STATE_JS)
+        except Exception as e:
+            if final:
+                url = state.get('url', '') if state else ''
+                return LoginOutcome(UNKNOWN, f"页面状态读取失败: {str(e)[:80]}", url)
+        else:
+            outcome = classify_login_state(state, final=final, baseline=baseline)
+            if outcome:
+                return outcome
+        time.sleep(interval)
+
+
+def classify_session_state(state):
+    """判定恢复的会话是否有效: True 有效、False 无效、None 尚无结论
+
+    精简模式下页面在 DOMContentLoaded (interactive) 时就返回，此时登录/退出链接已经在 DOM 中，
+    出现其中之一即可下结论；页面加载完成后两者都没有则视为无法确认 (无效)。
+    """
+    if state.get('readyState') not in ('interactive', 'complete'):
+        return None
+    if state.get('hasLoginLink') or state.get('hasPasswordField'):
+        return False
+    if state.get('hasLogoutLink'):
+        return True
+    return False if state.get('readyState') == 'complete' else None
+
+
+def detect_session_valid(driver, timeout=5, interval=0.2):
+    """在有限时间内轮询，返回恢复的会话是否有效；超时或读取失败视为无效"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            valid = classify_session_state(driver.execute_script(LOGIN_STATE_JS))
+        except Exception:
+            valid = None
+        if valid is not None:
+            return valid
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录调度器 - 按站点限速，避免登录请求过于密集
+"""
+
+import os
+import random
+import threading
+import time
+
+
+class RateLimiter:
+    """按主机的令牌桶限速器
+
+    每个主机平均每 interval 秒放行一次登录，允许 burst 次突发，
+    并在放行时间上叠加 0~jitter 秒的随机抖动。预约在锁内完成，
+    等待在锁外进行，因此多个工作线程可以同时启动浏览器、各自等待。
+    """
+
+    def __init__(self, interval, burst=1, jitter=0.0):
+        self.interval = max(0.0, float(interval))
+        self.burst = max(1, int(burst))
+        self.jitter = max(0.0, float(jitter))
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def reserve(self, host):
+        """为主机预约一个放行时间点 (time.monotonic 时间)"""
+        with self._lock:
+            now = time.monotonic()
+            # 理论到达时间: 桶满时可以提前 (burst - 1) 个间隔放行
+            slot = max(self._next_slot.get(host, now), now)
+            ready = max(now, slot - (self.burst - 1) * self.interval)
+            self._next_slot[host] = slot + self.interval
+        if self.jitter:
+            ready += random.uniform(0, self.jitter)
+        return ready
+
+    def acquire(self, host):
+        """等待直到主机允许下一次登录，返回实际等待秒数"""
+        delay = self.reserve(host) - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+            return delay
+        return 0.0
+
+
+def _env_float(name, default):
+    value = os.environ.get(name, '').strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"⚠️ {name} 无效: {value}，使用默认值 {default}")
+        return default
+
+
+def limiter_from_env():
+    """根据环境变量创建限速器
+
+    NETLIB_MIN_INTERVAL: 同一站点两次登录的平均间隔秒数 (默认 5)
+    NETLIB_BURST: 允许的突发登录次数 (默认 1)
+    NETLIB_JITTER: 随机抖动上限秒数 (默认 2)
+    """
+    interval = _env_float('NETLIB_MIN_INTERVAL', 5.0)
+    burst = int(_env_float('NETLIB_BURST', 1))
+    jitter = _env_float('NETLIB_JITTER', 2.0)
+    return RateLimiter(interval, burst=burst, jitter=jitter)
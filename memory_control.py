@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存感知的并发控制 - 采样浏览器进程树的常驻内存 (RSS) 和系统可用内存，动态调整同时登录的账号数
+
+只依赖 Linux 的 /proc，不需要 psutil。NETLIB_MEMORY_BUDGET_MB 设置后开启:
+  NETLIB_MEMORY_BUDGET_MB    浏览器进程树的内存预算 (MB)，auto 表示物理内存的 75%
+  NETLIB_MEMORY_RESERVE_MB   给系统保留的可用内存 (默认 512 MB)
+  NETLIB_MEMORY_INTERVAL     采样间隔秒数 (默认 1)
+NETLIB_WORKERS 作为并发上限。
+"""
+
+import os
+import threading
+
+MB = 1024 * 1024
+
+# 还没有采样数据时对单个浏览器内存占用的估计
+DEFAULT_BROWSER_ESTIMATE = 300 * MB
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def read_meminfo():
+    """返回 (MemTotal, MemAvailable) 字节数，无法读取时返回 (None, None)"""
+    values = {}
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in ('MemTotal', 'MemAvailable'):
+                    values[name] = int(rest.split()[0]) * 1024
+    except (OSError, ValueError):
+        return None, None
+    return values.get('MemTotal'), values.get('MemAvailable')
+
+
+def _children_map():
+    """读取 /proc 中所有进程的父进程号，返回 {父进程: [子进程]}"""
+    children = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'r') as f:
+                # 进程名可能包含空格和括号，从最后一个右括号之后解析
+                fields = f.read().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(name))
+    return children
+
+
+def _rss(pid):
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def process_tree_rss(pid, children=None):
+    """进程及其全部子孙进程的 RSS 之和 (字节)，进程已退出时返回 None"""
+    children = _children_map() if children is None else children
+    root = _rss(pid)
+    if root is None:
+        return None
+    total = root
+    stack = list(children.get(pid, []))
+    while stack:
+        child = stack.pop()
+        total += _rss(child) or 0
+        stack.extend(children.get(child, []))
+    return total
+
+
+class MemoryController:
+    """按内存余量调整并发数: 余量不足时降低，余量足够再容纳一个浏览器时提高
+
+    acquire()/release() 包围每个账号的登录；register() 登记浏览器的驱动进程号。
+    """
+
+    def __init__(self, max_workers, budget, reserve=512 * MB, interval=1.0, min_workers=1):
+        self.max_workers = max(1, max_workers)
+        self.min_workers = max(1, min(min_workers, self.max_workers))
+        self.budget = budget
+        self.reserve = reserve
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._browsers = {}
+        self._peaks = []
+        self._stop = threading.Event()
+        self._thread = None
+        self.used = 0
+        self.peak_total = 0
+        self.decisions = 0
+        self.limit = self._initial_limit()
+        print(f"🧠 内存控制: 预算 {budget / MB:.0f} MB, 保留 {reserve / MB:.0f} MB, "
+              f"初始并发 {self.limit}/{self.max_workers}")
+
+    def _browser_estimate(self):
+        peaks = self._peaks + [info['peak'] for info in self._browsers.values() if info['peak']]
+        return max(peaks) if peaks else DEFAULT_BROWSER_ESTIMATE
+
+    def _initial_limit(self):
+        _, available = read_meminfo()
+        room = self.budget
+        if available is not None:
+            room = min(room, available - self.reserve)
+        fit = int(room // DEFAULT_BROWSER_ESTIMATE)
+        return max(self.min_workers, min(self.max_workers, fit))
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='memory-control', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"⚠️ 内存采样失败: {str(e)[:80]}")
+
+    def register(self, pid):
+        if pid is None:
+            return
+        with self._cond:
+            self._browsers[pid] = {'peak': 0}
+
+    def acquire(self):
+        """等待并发数低于当前上限"""
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def sample(self):
+        """采样一次浏览器进程树和系统内存，并调整并发上限"""
+        with self._cond:
+            pids = list(self._browsers)
+        children = _children_map() if pids else {}
+        usage = {pid: process_tree_rss(pid, children) for pid in pids}
+        _, available = read_meminfo()
+
+        with self._cond:
+            used = 0
+            for pid, rss in usage.items():
+                info = self._browsers.get(pid)
+                if info is None:
+                    continue
+                if rss is None:
+                    # 浏览器已退出，保留峰值用于汇总
+                    if info['peak']:
+                        self._peaks.append(info['peak'])
+                    del self._browsers[pid]
+                    continue
+                info['peak'] = max(info['peak'], rss)
+                used += rss
+            self.used = used
+            self.peak_total = max(self.peak_total, used)
+
+            estimate = self._browser_estimate()
+            headroom = self.budget - used
+            if available is not None:
+                headroom = min(headroom, available - self.reserve)
+            if headroom < 0 and self.limit > self.min_workers:
+                self._set_limit(self.limit - 1, f"余量 {headroom / MB:.0f} MB 不足", used, available)
+            elif headroom > estimate * 1.5 and self.limit < self.max_workers and self._in_flight >= self.limit:
+                self._set_limit(self.limit + 1, f"余量 {headroom / MB:.0f} MB 可再容纳一个浏览器 "
+                                                f"(约 {estimate / MB:.0f} MB)", used, available)
+
+    def _set_limit(self, limit, reason, used, available):
+        old, self.limit = self.limit, limit
+        self.decisions += 1
+        available_text = f"{available / MB:.0f} MB" if available is not None else "未知"
+        print(f"🧠 并发 {old} -> {limit}: {reason} "
+              f"(浏览器占用 {used / MB:.0f} MB, 系统可用 {available_text})")
+        self._cond.notify_all()
+
+    def summary(self):
+        """返回 (浏览器数, 单个浏览器峰值 RSS 的最大值, 平均值, 全部浏览器合计峰值)"""
+        with self._cond:
+            peaks = self._peaks + [info['peak'] for info in self._browsers.values() if info['peak']]
+        if not peaks:
+            return 0, 0, 0, self.peak_total
+        return len(peaks), max(peaks), sum(peaks) / len(peaks), self.peak_total
+
+
+def controller_from_env(max_workers):
+    """NETLIB_MEMORY_BUDGET_MB 未设置或系统不支持 /proc 时返回 None"""
+    value = os.environ.get('NETLIB_MEMORY_BUDGET_MB', '').strip().lower()
+    if not value:
+        return None
+    total, _ = read_meminfo()
+    if total is None:
+        print("⚠️ 无法读取 /proc/meminfo，内存控制已禁用")
+        return None
+    try:
+        budget = total * 0.75 if value == 'auto' else float(value) * MB
+        reserve = float(os.environ.get('NETLIB_MEMORY_RESERVE_MB', '') or 512) * MB
+        interval = float(os.environ.get('NETLIB_MEMORY_INTERVAL', '') or 1.0)
+    except ValueError as e:
+        print(f"⚠️ 内存控制配置无效: {e}，已禁用")
+        return None
+    return MemoryController(max_workers, budget, reserve, interval)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 netlib.re 替身服务器 - 提供首页、登录页和登录后页面，用于离线测试登录流程
+
+用法: python netlib_stub_server.py --port 8000 --accounts user1:pass1,user2:pass2
+然后设置 NETLIB_BASE_URL=http://127.0.0.1:8000/ 运行登录脚本。
+"""
+
+import argparse
+import random
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+HOME_TEMPLATE = """<!DOCTYPE html>
+<html><head><title>NetLib</title>
+<link rel="stylesheet" href="/static/site.css"></head>
+<body>
+<nav>{nav}</nav>
+<h1>NetLib</h1>
+<img src="/static/banner.png" alt="">
+{body}
+</body></html>
+"""
+
+LOGIN_FORM = """<form action="/login" method="post">
+  <label>Username</label>
+  <input type="text" name="username" placeholder="Username">
+  <label>Password</label>
+  <input type="password" name="password" placeholder="Password">
+  <input type="hidden" name="csrf_token" value="{token}">
+  <button type="submit">Validate</button>
+</form>
+"""
+
+# 只有脚本渲染的登录页，用来触发 HTTP 后端回退
+JS_LOGIN_FORM = """<div id="app"></div>
+<script>
+document.getElementById('app').innerHTML = `
+<form onsubmit="return false;">
+  <input placeholder="Username"><input type="password" placeholder="Password">
+  <button type="button" onclick="fetch('/login', {method: 'POST',
+    headers: {'Content-Type': 'application/x-www-form-urlencoded'},
+    body: new URLSearchParams({username: this.form.elements[0].value,
+      password: this.form.elements[1].value, csrf_token: '{token}'})})
+    .then(() => location.href = '/')">Validate</button>
+</form>`;
+</script>
+"""
+
+
+# 页面引用的静态资源 (内容无意义，只用于让精简加载模式有可屏蔽的流量)
+STATIC_ASSETS = {
+    '/static/site.css': ('text/css', b"@font-face { font-family: Site; src: url(/static/site.woff2); }\n"
+                                     b"body { font-family: Site, sans-serif; }\n"),
+    '/static/site.woff2': ('font/woff2', bytes(48 * 1024)),
+    '/static/banner.png': ('image/png', bytes(120 * 1024)),
+}
+
+
+class StubServer:
+    """在后台线程中运行的替身服务器
+
+    accounts: {用户名: 密码}
+    js_only: 登录表单只由脚本渲染
+    latency: 每个请求的固定延迟秒数，jitter 为额外的随机延迟上限
+    failure_rate: 随机返回 503 的概率，用于故障注入
+    """
+
+    def __init__(self, accounts, host='127.0.0.1', port=0, js_only=False,
+                 latency=0.0, jitter=0.0, failure_rate=0.0, seed=None):
+        self.accounts = dict(accounts)
+        self.js_only = js_only
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.connections = 0
+        self.injected_failures = 0
+        self.sessions = {}
+        self.csrf_tokens = set()
+        self.lock = threading.Lock()
+        self.login_attempts = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                # 每个 TCP 连接创建一个处理器实例，用于统计长连接复用
+                super().setup()
+                with server.lock:
+                    server.connections += 1
+
+            def _user(self):
+                cookie = SimpleCookie(self.headers.get('Cookie', ''))
+                if 'session' not in cookie:
+                    return None
+                with server.lock:
+                    return server.sessions.get(cookie['session'].value)
+
+            def _send(self, status, html='', headers=None):
+                body = html.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_asset(self, path):
+                content_type, body = STATIC_ASSETS[path]
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'no-store')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _delay_or_fail(self):
+                """模拟网络延迟，并按概率注入 503 故障，返回是否已注入故障"""
+                with server.lock:
+                    server.requests += 1
+                    delay = server.latency + (server.random.uniform(0, server.jitter) if server.jitter else 0)
+                    failed = server.failure_rate and server.random.random() < server.failure_rate
+                    if failed:
+                        server.injected_failures += 1
+                if delay:
+                    time.sleep(delay)
+                if failed:
+                    self._send(503, '<html><body><h1>503 Service Unavailable</h1></body></html>')
+                return failed
+
+            def _page(self, user, body):
+                if user:
+                    nav = f'<span>{user}</span> <a href="/logout">Logout</a>'
+                else:
+                    nav = '<a href="/login">Login</a>'
+                return HOME_TEMPLATE.format(nav=nav, body=body)
+
+            def do_GET(self):
+                if self._delay_or_fail():
+                    return
+                path = self.path.split('?', 1)[0]
+                user = self._user()
+                if path == '/':
+                    body = '<p>Welcome back.</p>' if user else '<p>Please log in.</p>'
+                    self._send(200, self._page(user, body))
+                elif path == '/login':
+                    token = secrets.token_hex(8)
+                    with server.lock:
+                        server.csrf_tokens.add(token)
+                    form = JS_LOGIN_FORM if server.js_only else LOGIN_FORM
+                    self._send(200, self._page(user, form.replace('{token}', token)))
+                elif path in STATIC_ASSETS:
+                    self._send_asset(path)
+                elif path == '/logout':
+                    self._send(303, headers={'Location': '/', 'Set-Cookie': 'session=; Max-Age=0; Path=/'})
+                else:
+                    self._send(404, self._page(user, '<p>Not found</p>'))
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length).decode('utf-8')
+                if self._delay_or_fail():
+                    return
+                if self.path.split('?', 1)[0] != '/login':
+                    self._send(404)
+                    return
+                form = parse_qs(body)
+                username = form.get('username', [''])[0]
+                password = form.get('password', [''])[0]
+                token = form.get('csrf_token', [''])[0]
+
+                with server.lock:
+                    server.login_attempts += 1
+                    token_ok = token in server.csrf_tokens
+                    server.csrf_tokens.discard(token)
+                    ok = token_ok and server.accounts.get(username) == password and password != ''
+                    if ok:
+                        session_id = secrets.token_hex(16)
+                        server.sessions[session_id] = username
+
+                if ok:
+                    self._send(303, headers={
+                        'Location': '/',
+                        'Set-Cookie': f'session={session_id}; Path=/; HttpOnly',
+                    })
+                else:
+                    error = 'Error: invalid username or password' if token_ok else 'Error: invalid form token'
+                    body = f'<div class="error">{error}</div>' + LOGIN_FORM.replace('{token}', '')
+                    self._send(200, self._page(None, body))
+
+        return Handler
+
+
+def parse_accounts_arg(value):
+    accounts = {}
+    for item in value.split(','):
+        if ':' in item:
+            username, password = item.split(':', 1)
+            accounts[username.strip()] = password.strip()
+    return accounts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 netlib.re 替身服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--accounts', default='demo:demo', help='user1:pass1,user2:pass2')
+    parser.add_argument('--js-only', action='store_true', help='登录表单只由脚本渲染')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的延迟秒数')
+    parser.add_argument('--jitter', type=float, default=0.0, help='额外随机延迟上限秒数')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='随机返回 503 的概率')
+    args = parser.parse_args()
+
+    server = StubServer(parse_accounts_arg(args.accounts), args.host, args.port, args.js_only,
+                        latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate)
+    print(f"✅ 替身服务器已启动: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面就绪等待 - 基于真实信号 (readyState、URL 变化、网络空闲) 而不是固定 sleep
+"""
+
+import json
+import os
+import random
+import time
+
+# 各步骤的超时上限 (秒)，可用 NETLIB_TIMEOUT_<步骤名大写> 覆盖
+STEP_TIMEOUTS = {
+    'navigate': 20,
+    'element': 10,
+    'submit': 15,
+    'network_idle': 5,
+}
+
+NAVIGATION_MARKER = '__netlibNavigationMarker'
+
+
+def step_timeout(step):
+    """读取步骤超时上限"""
+    value = os.environ.get(f"NETLIB_TIMEOUT_{step.upper()}", '').strip()
+    try:
+        return float(value) if value else STEP_TIMEOUTS[step]
+    except ValueError:
+        return STEP_TIMEOUTS[step]
+
+
+def poll(condition, timeout, interval=0.1):
+    """轮询条件直到返回真值或超时，返回最后一次结果"""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = condition()
+        if result or time.monotonic() >= deadline:
+            return result
+        time.sleep(interval)
+
+
+def wait_for_ready_state(driver, timeout=None, state='complete'):
+    """等待 document.readyState 达到指定状态"""
+    timeout = step_timeout('navigate') if timeout is None else timeout
+    accepted = ('interactive', 'complete') if state == 'interactive' else ('complete',)
+    return poll(lambda: driver.execute_script('return document.readyState') in accepted, timeout)
+
+
+def mark_document(driver):
+    """在当前文档上打标记，用于检测之后是否发生了页面跳转"""
+    driver.execute_script(f"window.{NAVIGATION_MARKER} = true;")
+    return driver.current_url
+
+
+def wait_for_navigation(driver, url_before, timeout=None):
+    """等待提交后的跳转: 文档被替换 (标记消失) 或 URL 变化 (单页应用)"""
+    timeout = step_timeout('submit') if timeout is None else timeout
+
+    def navigated():
+        try:
+            changed = driver.execute_script(
+                f"return !window.{NAVIGATION_MARKER} || location.href !== arguments[0];",
+                url_before,
+            )
+        except Exception:
+            # 跳转过程中脚本可能执行失败，下一轮再试
+            return False
+        return changed
+
+    return poll(navigated, timeout, interval=0.1)
+
+
+def _drain_network_events(driver, inflight):
+    """读取 CDP 性能日志中的网络事件，更新进行中的请求集合，返回是否有新事件"""
+    seen = False
+    for entry in driver.get_log('performance'):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        method = message.get('method', '')
+        if not method.startswith('Network.'):
+            continue
+        request_id = message.get('params', {}).get('requestId')
+        if method == 'Network.requestWillBeSent':
+            inflight.add(request_id)
+            seen = True
+        elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+            inflight.discard(request_id)
+            seen = True
+    return seen
+
+
+def wait_for_network_idle(driver, idle_time=0.5, timeout=None):
+    """等待网络空闲: 连续 idle_time 秒没有进行中的请求
+
+    优先使用 chromedriver 转发的 CDP 网络事件 (goog:loggingPrefs performance)，
+    没有性能日志时退化为检查 Resource Timing 条目数量是否稳定。
+    """
+    timeout = step_timeout('network_idle') if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    inflight = set()
+    try:
+        # 已积压的事件中完成的请求已被移除，剩下的是仍在进行中的请求，需要继续等待
+        _drain_network_events(driver, inflight)
+        read_events = lambda: _drain_network_events(driver, inflight)
+    except Exception:
+        last_count = [None]
+
+        def read_events():
+            count = driver.execute_script("return performance.getEntriesByType('resource').length")
+            changed = count != last_count[0]
+            last_count[0] = count
+            return changed
+
+    quiet_since = time.monotonic()
+    while time.monotonic() < deadline:
+        if read_events() or inflight:
+            quiet_since = time.monotonic()
+        elif time.monotonic() - quiet_since >= idle_time:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def human_delay():
+    """可选的拟人化最小停顿 (NETLIB_HUMAN_DELAY 秒，默认 0 表示不停顿)"""
+    value = os.environ.get('NETLIB_HUMAN_DELAY', '').strip()
+    try:
+        minimum = float(value) if value else 0.0
+    except ValueError:
+        minimum = 0.0
+    if minimum > 0:
+        time.sleep(random.uniform(minimum, minimum * 1.5))
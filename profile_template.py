@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器配置模板 - 只初始化一次 user-data-dir，之后每个浏览器从模板克隆到 /dev/shm，启动时不再创建配置
+
+NETLIB_PROFILE_TEMPLATE=1 开启:
+  NETLIB_PROFILE_DIR     模板和克隆所在目录 (默认 /dev/shm/netlib-profiles，不可用时使用临时目录)
+  NETLIB_PROFILE_CLONE   克隆方式: auto (默认，先尝试 reflink，再用硬链接)、reflink、hardlink、copy
+
+模板文件设为只读: Chrome 以"写临时文件再改名"方式更新的文件可以安全地硬链接共享，
+原地写入的文件 (SQLite 数据库、LevelDB 日志等) 总是复制，即使误写也只会失败而不会改坏模板。
+克隆目录在浏览器退出后由后台线程删除。
+"""
+
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import uuid
+
+CLONE_MODES = ('auto', 'reflink', 'hardlink', 'copy')
+
+READY_MARKER = '.netlib_template_ready'
+
+# Chrome 通过改名原子替换的文件，可以与模板共享 inode
+ATOMIC_FILES = {'Local State', 'Preferences', 'Secure Preferences', 'First Run', 'Last Version'}
+
+# 模板中不保留的文件和目录: 进程锁和可重建的缓存
+SKIP_NAMES = {'SingletonLock', 'SingletonSocket', 'SingletonCookie', 'lockfile',
+              'Cache', 'Code Cache', 'GPUCache', 'GrShaderCache', 'ShaderCache',
+              'DawnCache', 'Crashpad', 'component_crx_cache'}
+
+
+def default_base_dir():
+    shm = '/dev/shm'
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return os.path.join(shm, 'netlib-profiles')
+    return os.path.join(tempfile.gettempdir(), 'netlib-profiles')
+
+
+def _copy_file(src, dst):
+    shutil.copyfile(src, dst)
+    os.chmod(dst, 0o644)
+
+
+def _clone_tree(src, dst, hardlink):
+    """逐个文件克隆目录树；hardlink 为真时原子替换的文件使用硬链接"""
+    os.makedirs(dst)
+    for root, dirs, files in os.walk(src):
+        target_root = os.path.join(dst, os.path.relpath(root, src))
+        for name in dirs:
+            os.makedirs(os.path.join(target_root, name), exist_ok=True)
+        for name in files:
+            if name == READY_MARKER:
+                continue
+            source = os.path.join(root, name)
+            target = os.path.join(target_root, name)
+            if hardlink and name in ATOMIC_FILES:
+                try:
+                    os.link(source, target)
+                    continue
+                except OSError:
+                    pass
+            _copy_file(source, target)
+
+
+def _reflink_tree(src, dst):
+    """用 cp --reflink=always 写时复制整个目录 (需要 btrfs/xfs 等支持 reflink 的文件系统)"""
+    result = subprocess.run(['cp', '-r', '--reflink=always', src, dst],
+                            capture_output=True, text=True, timeout=30)
+    if result.returncode != 0:
+        shutil.rmtree(dst, ignore_errors=True)
+        raise OSError(result.stderr.strip() or 'reflink 失败')
+    os.remove(os.path.join(dst, READY_MARKER))
+    for root, dirs, files in os.walk(dst):
+        for name in files:
+            os.chmod(os.path.join(root, name), 0o644)
+
+
+class ProfileTemplate:
+    """构建一次模板，按需克隆，并在后台删除用完的克隆"""
+
+    def __init__(self, base_dir=None, mode='auto'):
+        self.base_dir = base_dir or default_base_dir()
+        self.mode = mode if mode in CLONE_MODES else 'auto'
+        self.template_dir = os.path.join(self.base_dir, 'template')
+        self._lock = threading.Lock()
+        self._ready = False
+        self._reflink_ok = self.mode in ('auto', 'reflink')
+        self._cleanup = queue.Queue()
+        self._cleaner = None
+        self.clones = 0
+        self.removed = 0
+
+    def ensure(self, build, version=None):
+        """模板不存在或浏览器版本变化时调用 build(路径) 重新构建，返回是否可用"""
+        with self._lock:
+            if self._ready:
+                return True
+            if self._template_matches(version):
+                self._ready = True
+                return True
+            shutil.rmtree(self.template_dir, ignore_errors=True)
+            os.makedirs(self.base_dir, exist_ok=True)
+            building = f"{self.template_dir}.{uuid.uuid4().hex[:8]}"
+            try:
+                build(building)
+                self._finalize(building, version)
+                os.replace(building, self.template_dir)
+            except Exception as e:
+                shutil.rmtree(building, ignore_errors=True)
+                if self._template_matches(version):
+                    # 其他进程 (例如并行的分片) 已经构建好了模板
+                    self._ready = True
+                    return True
+                print(f"⚠️ 浏览器配置模板构建失败，使用默认配置: {str(e)[:80]}")
+                return False
+            print(f"✅ 浏览器配置模板已就绪: {self.template_dir}")
+            self._ready = True
+            return True
+
+    def _template_matches(self, version):
+        try:
+            with open(os.path.join(self.template_dir, READY_MARKER), 'r', encoding='utf-8') as f:
+                return f.read().strip() == (version or '')
+        except OSError:
+            return False
+
+    def _finalize(self, path, version):
+        """删除锁文件和缓存，文件设为只读，写入就绪标记"""
+        for root, dirs, files in os.walk(path):
+            for name in [d for d in dirs if d in SKIP_NAMES]:
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+                dirs.remove(name)
+            for name in files:
+                file_path = os.path.join(root, name)
+                if name in SKIP_NAMES or os.path.islink(file_path):
+                    os.remove(file_path)
+                else:
+                    os.chmod(file_path, 0o444)
+        with open(os.path.join(path, READY_MARKER), 'w', encoding='utf-8') as f:
+            f.write(version or '')
+
+    def clone(self):
+        """克隆模板到新的目录并返回路径"""
+        target = os.path.join(self.base_dir, f"profile-{uuid.uuid4().hex}")
+        if self._reflink_ok:
+            try:
+                _reflink_tree(self.template_dir, target)
+                self.clones += 1
+                return target
+            except (OSError, subprocess.SubprocessError) as e:
+                if self.mode == 'reflink':
+                    print(f"⚠️ 文件系统不支持 reflink，改用硬链接: {str(e)[:60]}")
+                self._reflink_ok = False
+        _clone_tree(self.template_dir, target, hardlink=self.mode != 'copy')
+        self.clones += 1
+        return target
+
+    def discard(self, path):
+        """把克隆目录交给后台线程删除"""
+        if self._cleaner is None:
+            with self._lock:
+                if self._cleaner is None:
+                    self._cleaner = threading.Thread(target=self._clean_loop, name='profile-cleanup', daemon=True)
+                    self._cleaner.start()
+        self._cleanup.put(path)
+
+    def _clean_loop(self):
+        while True:
+            path = self._cleanup.get()
+            try:
+                if path is None:
+                    return
+                shutil.rmtree(path, ignore_errors=True)
+                self.removed += 1
+            finally:
+                self._cleanup.task_done()
+
+    def close(self):
+        """等待所有排队的删除完成"""
+        if self._cleaner is not None:
+            self._cleanup.put(None)
+            self._cleaner.join()
+            self._cleaner = None
+
+
+def template_from_env():
+    """NETLIB_PROFILE_TEMPLATE 未开启时返回 None"""
+    if os.environ.get('NETLIB_PROFILE_TEMPLATE', '').strip().lower() not in ('1', 'true', 'yes'):
+        return None
+    mode = os.environ.get('NETLIB_PROFILE_CLONE', 'auto').strip().lower()
+    if mode not in CLONE_MODES:
+        print(f"⚠️ NETLIB_PROFILE_CLONE 无效: {mode}，使用 auto")
+        mode = 'auto'
+    return ProfileTemplate(os.environ.get('NETLIB_PROFILE_DIR', '').strip() or None, mode)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重试策略 - 按阶段的指数退避重试，以及按站点的熔断器
+"""
+
+import os
+import random
+import threading
+import time
+
+
+class PhaseFailed(Exception):
+    """登录阶段失败；retryable 为 False 表示站点已明确拒绝 (例如密码错误)，不应重试"""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class RetryPolicy:
+    """每个阶段最多尝试 attempts 次，重试间隔指数增长并带随机抖动"""
+
+    def __init__(self, attempts=3, base_delay=1.0, max_delay=20.0, jitter=0.5):
+        self.attempts = max(1, int(attempts))
+        self.base_delay = max(0.0, float(base_delay))
+        self.max_delay = max(0.0, float(max_delay))
+        self.jitter = min(1.0, max(0.0, float(jitter)))
+
+    def delay(self, retry):
+        """第 retry 次重试 (从 1 开始) 前的等待秒数"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (retry - 1)))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class CircuitBreaker:
+    """按主机统计连续失败，超过阈值后熔断
+
+    熔断期间 allow() 直接返回 False，剩余账号快速失败而不是逐个等待超时；
+    冷却时间过后放行一个探测请求，成功则恢复，失败则继续熔断。
+    探测请求没有得出结论就结束时 (例如浏览器启动失败) 必须调用 abandon()，否则不会再放行新的探测。
+    """
+
+    def __init__(self, threshold=5, cooldown=300.0):
+        self.threshold = max(1, int(threshold))
+        self.cooldown = max(0.0, float(cooldown))
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._opened_at = {}
+        # 半开状态的主机 -> 发起探测的线程
+        self._probing = {}
+
+    def allow(self, host):
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return True
+            if host in self._probing or time.monotonic() - opened_at < self.cooldown:
+                return False
+            # 半开状态: 只放行一个探测请求
+            self._probing[host] = threading.get_ident()
+            return True
+
+    def abandon(self, host):
+        """当前线程的探测请求没有结论就结束: 保持熔断，下一次 allow() 重新放行探测"""
+        with self._lock:
+            if self._probing.get(host) == threading.get_ident():
+                del self._probing[host]
+
+    def reset(self):
+        """清空所有主机的状态 (守护进程每一轮开始时调用)"""
+        with self._lock:
+            self._failures.clear()
+            self._opened_at.clear()
+            self._probing.clear()
+
+    def is_open(self, host):
+        with self._lock:
+            return host in self._opened_at
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures[host] = 0
+            self._probing.pop(host, None)
+            if self._opened_at.pop(host, None) is not None:
+                print(f"✅ 熔断恢复: {host}")
+
+    def record_failure(self, host):
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+            probing = self._probing.pop(host, None) is not None
+            if probing or (host not in self._opened_at and self._failures[host] >= self.threshold):
+                self._opened_at[host] = time.monotonic()
+                print(f"⛔ 熔断: {host} 连续失败 {self._failures[host]} 次，"
+                      f"{self.cooldown:.0f} 秒内不再发起登录")
+
+
+def _env_number(name, default):
+    value = os.environ.get(name, '').strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        print(f"⚠️ {name} 无效: {value}，使用默认值 {default}")
+        return default
+
+
+def policy_from_env():
+    """NETLIB_RETRY_ATTEMPTS (默认 3)、NETLIB_RETRY_BASE_DELAY (默认 1 秒)、NETLIB_RETRY_MAX_DELAY (默认 20 秒)"""
+    return RetryPolicy(
+        attempts=_env_number('NETLIB_RETRY_ATTEMPTS', 3),
+        base_delay=_env_number('NETLIB_RETRY_BASE_DELAY', 1.0),
+        max_delay=_env_number('NETLIB_RETRY_MAX_DELAY', 20.0),
+    )
+
+
+def breaker_from_env():
+    """NETLIB_BREAKER_THRESHOLD (默认 5 次连续失败)、NETLIB_BREAKER_COOLDOWN (默认 300 秒)"""
+    return CircuitBreaker(
+        threshold=_env_number('NETLIB_BREAKER_THRESHOLD', 5),
+        cooldown=_env_number('NETLIB_BREAKER_COOLDOWN', 300.0),
+    )
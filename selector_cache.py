@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+选择器缓存 - 记住上次命中的选择器，下次运行优先尝试
+"""
+
+import json
+import os
+import threading
+
+
+class SelectorCache:
+    """按 站点|页面|字段 记录命中选择器的磁盘缓存
+
+    缓存文件是普通 JSON，可以作为构建产物上传或通过 Actions cache 恢复。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._entries = dict(data.get('entries', {}))
+            print(f"✅ 已加载选择器缓存: {self.path} ({len(self._entries)} 条)")
+        except Exception as e:
+            print(f"⚠️ 选择器缓存读取失败，忽略: {str(e)[:80]}")
+            self._entries = {}
+
+    @staticmethod
+    def make_key(site, page, field):
+        return f"{site}|{page}|{field}"
+
+    def prioritize(self, key, selectors):
+        """返回 (重排后的选择器列表, 缓存的选择器)，缓存项排在最前"""
+        selectors = [tuple(selector) for selector in selectors]
+        with self._lock:
+            entry = self._entries.get(key)
+        if not entry:
+            return selectors, None
+        cached = (entry['by'], entry['value'])
+        if cached not in selectors:
+            # 选择器列表已变更，缓存项失效
+            self.evict(key)
+            return selectors, None
+        return [cached] + [s for s in selectors if s != cached], cached
+
+    def record(self, key, cached, matched):
+        """记录一次查找结果，更新命中统计和缓存项"""
+        with self._lock:
+            if cached is not None and matched == cached:
+                self.hits += 1
+                return
+            self.misses += 1
+            if matched is None:
+                if self._entries.pop(key, None) is not None:
+                    self._dirty = True
+            else:
+                self._entries[key] = {'by': matched[0], 'value': matched[1]}
+                self._dirty = True
+
+    def evict(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._dirty = True
+
+    def save(self):
+        """原子写回缓存文件，没有变更时跳过"""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            data = {'version': 1, 'entries': self._entries}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        return f"命中 {self.hits} 次, 未命中 {self.misses} 次, 命中率 {rate:.1f}%"
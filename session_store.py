@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话存储 - 按账号加密保存登录后的 Cookie，下次运行直接复用
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+
+# 写回浏览器时 Network.setCookies 接受的字段
+COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires')
+
+
+class SessionStore:
+    """每个账号一个加密 Cookie 文件 (Fernet: AES-128-CBC + HMAC-SHA256)"""
+
+    def __init__(self, directory, secret):
+        from cryptography.fernet import Fernet
+
+        key = base64.urlsafe_b64encode(hashlib.sha256(secret.encode('utf-8')).digest())
+        self._fernet = Fernet(key)
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, site, username):
+        digest = hashlib.sha256(f"{site}|{username}".encode('utf-8')).hexdigest()[:24]
+        return os.path.join(self.directory, f"{digest}.session")
+
+    def load(self, site, username):
+        """读取账号的 Cookie 列表，不存在或无法解密时返回 None"""
+        path = self._path(site, username)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                data = json.loads(self._fernet.decrypt(f.read()))
+        except Exception as e:
+            print(f"⚠️ 会话文件无法解密，已丢弃: {type(e).__name__}")
+            self.delete(site, username)
+            return None
+        if data.get('username') != username:
+            return None
+        return data.get('cookies') or None
+
+    def save(self, site, username, cookies):
+        """加密保存账号的 Cookie 列表"""
+        cookies = [
+            {field: cookie[field] for field in COOKIE_FIELDS if field in cookie}
+            for cookie in cookies
+        ]
+        for cookie in cookies:
+            # 会话 Cookie 的 expires 为 -1，写回时省略
+            if cookie.get('expires', 0) < 0:
+                cookie.pop('expires')
+        payload = json.dumps({'username': username, 'cookies': cookies}).encode('utf-8')
+        path = self._path(site, username)
+        with self._lock:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(self._fernet.encrypt(payload))
+            os.replace(tmp_path, path)
+
+    def delete(self, site, username):
+        try:
+            os.remove(self._path(site, username))
+        except FileNotFoundError:
+            pass
+
+
+def store_from_env():
+    """根据环境变量创建会话存储，未配置密钥时返回 None
+
+    NETLIB_SESSION_KEY: 加密密钥 (建议放在 GitHub Secrets 中)
+    NETLIB_SESSION_DIR: 会话文件目录 (默认 sessions)
+    """
+    secret = os.environ.get('NETLIB_SESSION_KEY', '')
+    if not secret:
+        return None
+    try:
+        return SessionStore(os.environ.get('NETLIB_SESSION_DIR', 'sessions'), secret)
+    except ImportError:
+        print("⚠️ 未安装 cryptography，会话复用已禁用")
+        return None
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片运行 - 按用户名的稳定哈希把账号分配到多个运行器，并合并各分片的结果文件
+
+本地验证 (4 个分片各自一个进程，然后合并):
+  for i in 1 2 3 4; do
+    python fixed_browser_login.py --shard $i/4 &
+  done; wait
+  python fixed_browser_login.py --merge results_shard_*_of_4.json
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from checkin_state import STATUS_FAILED, STATUS_SUCCESS, SUCCESS_STATUSES
+
+
+def parse_shard(value):
+    """解析 i/N 形式的分片参数 (i 从 1 开始)，返回 (i, N)"""
+    try:
+        index, total = (int(part) for part in value.split('/', 1))
+    except ValueError:
+        raise ValueError(f"分片格式应为 i/N，例如 1/4: {value}")
+    if total < 1 or not 1 <= index <= total:
+        raise ValueError(f"分片序号超出范围: {value}")
+    return index, total
+
+
+def shard_of(username, total):
+    """用户名所属的分片 (1..N)，与 Python 哈希种子和账号顺序无关"""
+    digest = hashlib.sha256(username.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % total + 1
+
+
+def filter_shard(accounts, index, total):
+    """只保留属于指定分片的账号，保持流式读取"""
+    for account in accounts:
+        if shard_of(account.username, total) == index:
+            yield account
+
+
+def default_results_path(index, total):
+    return f"results_shard_{index}_of_{total}.json"
+
+
+def write_results(path, results, shard=None, stats=None):
+    """写出机器可读的结果文件"""
+    data = {
+        'version': 1,
+        'shard': f"{shard[0]}/{shard[1]}" if shard else None,
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': [{'username': username, 'status': status, 'success': status in SUCCESS_STATUSES}
+                    for username, status in results],
+        'stats': dict(stats or {}),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_results(paths):
+    """读取并合并多个结果文件，返回 (结果列表, 合并后的统计, 警告列表)
+
+    结果按分片序号排列，同一分片内保持原顺序。
+    """
+    shards = []
+    warnings = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            shards.append((path, json.load(f)))
+
+    def shard_key(item):
+        shard = item[1].get('shard')
+        return parse_shard(shard) if shard else (0, 0)
+
+    shards.sort(key=shard_key)
+    totals = {shard_key(item)[1] for item in shards if item[1].get('shard')}
+    if len(totals) > 1:
+        warnings.append(f"结果文件来自不同的分片数: {sorted(totals)}")
+    elif totals:
+        total = totals.pop()
+        seen = [shard_key(item)[0] for item in shards]
+        missing = sorted(set(range(1, total + 1)) - set(seen))
+        duplicated = sorted({i for i in seen if seen.count(i) > 1})
+        if missing:
+            warnings.append(f"缺少分片: {', '.join(f'{i}/{total}' for i in missing)}")
+        if duplicated:
+            warnings.append(f"重复的分片: {', '.join(f'{i}/{total}' for i in duplicated)}")
+
+    results = []
+    stats = {}
+    for _, data in shards:
+        # 旧版结果文件只有 success 字段
+        results.extend((item['username'],
+                        item.get('status') or (STATUS_SUCCESS if item['success'] else STATUS_FAILED))
+                       for item in data.get('results', []))
+        for name, value in data.get('stats', {}).items():
+            stats[name] = stats.get(name, 0) + value
+    return results, stats, warnings
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录后端测试脚本
+在本地替身服务器上分别运行 HTTP 后端和浏览器后端，验证登录结果和自动回退
+"""
+
+import os
+import sys
+import traceback
+
+# 测试时不限速、不写选择器缓存和签到状态
+os.environ.setdefault('NETLIB_MIN_INTERVAL', '0')
+os.environ.setdefault('NETLIB_JITTER', '0')
+os.environ['NETLIB_SELECTOR_CACHE'] = ''
+os.environ['NETLIB_STATE_FILE'] = ''
+
+import fixed_browser_login
+from http_login import HttpFallback, http_login
+from netlib_stub_server import StubServer
+
+ACCOUNTS = {'alice': 'alice-pass', 'bob': 'bob-pass'}
+
+
+def check(results, name, func):
+    """运行单个检查并记录结果"""
+    print(f"\n--- {name} ---")
+    try:
+        outcome = func()
+    except Exception as e:
+        print(f"❌ 异常: {str(e)}")
+        traceback.print_exc()
+        outcome = False
+    if outcome is None:
+        print(f"⚠️ 跳过: {name}")
+    else:
+        print(f"{'✅ 通过' if outcome else '❌ 失败'}: {name}")
+    results.append((name, outcome))
+
+
+def http_success(server):
+    return http_login('alice', 'alice-pass', 1, server.base_url) is True
+
+
+def http_wrong_password(server):
+    return http_login('bob', 'wrong', 2, server.base_url) is False
+
+
+def http_reuses_connections(server):
+    """连续登录的账号复用共享连接池中的同一个长连接"""
+    before = server.connections
+    results = [http_login('alice', 'alice-pass', 1, server.base_url) for _ in range(3)]
+    opened = server.connections - before
+    print(f"3 次登录新建了 {opened} 个连接")
+    return all(results) and opened <= 1
+
+
+def http_js_only_raises_fallback(server):
+    try:
+        http_login('alice', 'alice-pass', 1, server.base_url)
+    except HttpFallback as e:
+        print(f"✅ 触发回退: {e}")
+        return True
+    return False
+
+
+def browser_login(server, backend, username, password, expected):
+    """通过 process_account 走完整流程，没有 Chrome 时跳过"""
+    if not fixed_browser_login.find_chrome_binary():
+        return None
+    os.environ['NETLIB_BACKEND'] = backend
+    fixed_browser_login.BASE_URL = server.base_url
+    try:
+        return fixed_browser_login.process_account(username, password, 1) is expected
+    finally:
+        os.environ.pop('NETLIB_BACKEND', None)
+
+
+def main():
+    """主函数"""
+    print("=" * 60)
+    print("登录后端测试脚本")
+    print("=" * 60)
+
+    results = []
+    with StubServer(ACCOUNTS) as server:
+        check(results, "HTTP 后端: 正确密码登录成功", lambda: http_success(server))
+        check(results, "HTTP 后端: 错误密码登录失败", lambda: http_wrong_password(server))
+        check(results, "HTTP 后端: 账号之间复用连接", lambda: http_reuses_connections(server))
+        check(results, "浏览器后端: 正确密码登录成功",
+              lambda: browser_login(server, 'selenium', 'alice', 'alice-pass', True))
+        check(results, "浏览器后端: 错误密码登录失败",
+              lambda: browser_login(server, 'selenium', 'bob', 'wrong', False))
+
+    with StubServer(ACCOUNTS, js_only=True) as server:
+        check(results, "HTTP 后端: JS 表单触发回退", lambda: http_js_only_raises_fallback(server))
+        check(results, "HTTP 后端: 回退到浏览器后登录成功",
+              lambda: browser_login(server, 'http', 'alice', 'alice-pass', True))
+
+    print("\n" + "=" * 60)
+    failed = [name for name, outcome in results if outcome is False]
+    skipped = [name for name, outcome in results if outcome is None]
+    print(f"通过: {len(results) - len(failed) - len(skipped)}, 失败: {len(failed)}, 跳过: {len(skipped)}")
+    if failed:
+        print("❌ 存在失败的检查")
+        sys.exit(1)
+    print("✅ 所有检查通过")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录判定逻辑测试脚本
+不需要浏览器和网络，直接检查登录结果判定的各种页面状态和熔断器的状态变化
+"""
+
+import json
+import os
+import sys
+import threading
+import traceback
+from fnmatch import fnmatchcase
+
+from lean_loading import blocked_url_patterns
+from login_outcome import FAILURE, SUCCESS, UNKNOWN, classify_login_state, classify_session_state
+from page_waits import wait_for_network_idle
+from retry_policy import CircuitBreaker
+
+
+def state(**fields):
+    """构造页面状态快照，默认是已加载完成、没有登录表单的页面"""
+    base = {'url': 'https://example.test/', 'readyState': 'complete', 'cookies': [],
+            'hasLoginLink': False, 'hasLogoutLink': False, 'hasPasswordField': False, 'errors': []}
+    base.update(fields)
+    return base
+
+
+def check(results, name, func):
+    """运行单个检查并记录结果"""
+    try:
+        outcome = func()
+    except Exception as e:
+        print(f"❌ 异常: {name}: {str(e)}")
+        traceback.print_exc()
+        outcome = False
+    print(f"{'✅ 通过' if outcome else '❌ 失败'}: {name}")
+    results.append((name, outcome))
+
+
+def status(snapshot, final=True, baseline=None):
+    return classify_login_state(snapshot, final=final, baseline=baseline).status
+
+
+def outcome_checks(results):
+    login_page = {'url': 'https://example.test/login', 'cookies': []}
+    check(results, "判定: 有退出链接即成功",
+          lambda: status(state(hasLogoutLink=True)) == SUCCESS)
+    check(results, "判定: 离开登录页面并新增 Cookie 即成功",
+          lambda: status(state(cookies=['session']), baseline=login_page) == SUCCESS)
+    check(results, "判定: 错误页 (没有任何正面信号) 不算成功",
+          lambda: status(state(url='https://example.test/login'), baseline=login_page) == UNKNOWN)
+    check(results, "判定: 空白页不算成功",
+          lambda: status(state()) == UNKNOWN)
+    check(results, "判定: 登录后页面的 error 字样不算失败",
+          lambda: status(state(hasLogoutLink=True, errors=['0 errors today'])) == SUCCESS)
+    check(results, "判定: 登录表单上的错误信息为失败",
+          lambda: status(state(hasPasswordField=True, errors=['Error: invalid password'])) == FAILURE)
+    check(results, "判定: 未加载完成时继续等待",
+          lambda: classify_login_state(state(readyState='loading', hasLogoutLink=True)) is None)
+    check(results, "会话: DOMContentLoaded 时有退出链接即有效",
+          lambda: classify_session_state(state(readyState='interactive', hasLogoutLink=True)) is True)
+    check(results, "会话: DOMContentLoaded 时有登录链接即无效",
+          lambda: classify_session_state(state(readyState='interactive', hasLoginLink=True)) is False)
+    check(results, "会话: 两种链接都没有时等待加载完成",
+          lambda: classify_session_state(state(readyState='interactive')) is None
+          and classify_session_state(state()) is False)
+    check(results, "网络空闲: 不丢弃调用前已开始的请求", network_idle_waits_for_backlog)
+    check(results, "精简加载: 屏蔽带查询参数的静态资源", lean_blocks_versioned_assets)
+
+
+class EventLog:
+    """按顺序返回预先准备的 CDP 性能日志批次，之后返回空列表"""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+
+    def get_log(self, log_type):
+        if not self.batches:
+            return []
+        return [{'message': json.dumps({'message': {'method': method, 'params': {'requestId': request_id}}})}
+                for method, request_id in self.batches.pop(0)]
+
+
+def network_idle_waits_for_backlog():
+    """调用前已开始、尚未完成的请求要等到完成后才算空闲"""
+    pending = EventLog([('Network.requestWillBeSent', '1'), ('Network.requestWillBeSent', '2'),
+                        ('Network.loadingFinished', '2')])
+    finished = EventLog([('Network.requestWillBeSent', '1')], [], [], [('Network.loadingFinished', '1')])
+    return (not wait_for_network_idle(pending, idle_time=0.1, timeout=0.5)
+            and wait_for_network_idle(finished, idle_time=0.1, timeout=2))
+
+
+def blocked(url):
+    """按 setBlockedURLs 的通配规则 (* 匹配任意字符) 判断 URL 是否被屏蔽"""
+    return any(fnmatchcase(url, pattern) for pattern in blocked_url_patterns())
+
+
+def lean_blocks_versioned_assets():
+    """带查询参数 (缓存版本号) 的资源同样屏蔽，页面和脚本不受影响"""
+    os.environ['NETLIB_LEAN_TYPES'] = 'image,font,stylesheet'
+    try:
+        return (blocked('https://example.test/static/site.css?v=3')
+                and blocked('https://example.test/banner.png?123')
+                and blocked('https://example.test/site.woff2')
+                and not blocked('https://example.test/login?next=/png')
+                and not blocked('https://example.test/app.js?v=3'))
+    finally:
+        os.environ.pop('NETLIB_LEAN_TYPES', None)
+
+
+def breaker_probe_cycle():
+    """熔断 -> 冷却后探测失败 -> 再次探测 -> 探测成功恢复"""
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    breaker.record_failure('h')
+    steps = [breaker.is_open('h'), breaker.allow('h'), not breaker.allow('h')]
+    breaker.record_failure('h')
+    steps += [breaker.allow('h')]
+    breaker.record_success('h')
+    steps += [not breaker.is_open('h'), breaker.allow('h')]
+    return all(steps)
+
+
+def breaker_abandoned_probe():
+    """探测没有结论就结束时，下一个账号可以重新探测；其他线程不能取消当前线程的探测"""
+    breaker = CircuitBreaker(threshold=1, cooldown=0)
+    breaker.record_failure('h')
+    first = breaker.allow('h')
+    other = threading.Thread(target=breaker.abandon, args=('h',))
+    other.start()
+    other.join()
+    still_probing = not breaker.allow('h')
+    breaker.abandon('h')
+    return first and still_probing and breaker.allow('h') and breaker.is_open('h')
+
+
+def breaker_cooldown():
+    breaker = CircuitBreaker(threshold=2, cooldown=3600)
+    breaker.record_failure('h')
+    closed = breaker.allow('h')
+    breaker.record_failure('h')
+    return closed and not breaker.allow('h') and breaker.allow('other')
+
+
+def breaker_checks(results):
+    check(results, "熔断: 探测失败后冷却结束可再次探测，成功后恢复", breaker_probe_cycle)
+    check(results, "熔断: 放弃的探测不会让主机永久熔断", breaker_abandoned_probe)
+    check(results, "熔断: 达到阈值前放行，冷却期间拒绝，其他主机不受影响", breaker_cooldown)
+
+
+def main():
+    """主函数"""
+    print("=" * 60)
+    print("登录判定逻辑测试脚本")
+    print("=" * 60)
+
+    results = []
+    outcome_checks(results)
+    breaker_checks(results)
+
+    failed = sum(1 for _, outcome in results if not outcome)
+    print("\n" + "=" * 60)
+    print(f"通过: {len(results) - failed}, 失败: {failed}")
+    if failed:
+        print("❌ 存在失败的检查")
+        sys.exit(1)
+    print("✅ 所有检查通过")
+
+
+if __name__ == "__main__":
+    main()